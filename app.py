@@ -4,31 +4,53 @@
 
 # Import required libraries
 import dash
-from typing import Any
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
 import dash_bootstrap_components as dbc
+import flask
+from dash.dependencies import ALL, Input, Output, State
+from dash.exceptions import PreventUpdate
+from flask_compress import Compress
 import os
+import io
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import time
 import boto3
-import pickle
+from botocore.exceptions import ClientError
+from pathlib import Path
+from urllib.parse import parse_qs
 
 # Module imports
-import plotdata
+import bundle
+import datatable
+import drilldown
 import layout
+import metrics
+import sections
 
 # import process
 
-# Initalize terms to process
-CURRENT_TERM = "Summer2021"
-PREVIOUS_TERM = "Summer2020"
+logger = logging.getLogger(__name__)
 
 # Initialize server
 app: dash.Dash = dash.Dash(
     __name__,
     meta_tags=[{"name": "viewport", "content": "width=device-width"}],
     external_stylesheets=[dbc.themes.FLATLY],
+    suppress_callback_exceptions=True,
+    compress=False,
 )
 server: Any = app.server
 
-app.title = f"Chemistry Enrollment Statistics for {CURRENT_TERM}"
+# Compress responses with Brotli when the browser accepts it, otherwise gzip
+server.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+Compress(server)
+
+app.title = "Chemistry Enrollment Statistics"
 
 # Load s3 environment variables
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
@@ -36,60 +58,712 @@ AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
 AWS_BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME")
 
 
+# Local stand-in for the S3 bucket, e.g. for development without AWS
+S3_LOCAL_DIR = os.environ.get("S3_LOCAL_DIR")
+
+# Seconds between checks for a new bundle version (0 disables hot reload)
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", 300))
+
+# Seconds between attempts to load the bundle until the first load succeeds
+LOAD_RETRY_INTERVAL = 10
+
+# Load the bundle and render every tab at import, e.g. in a preloading gunicorn
+# master; the refresher is then started in each worker (see gunicorn.conf.py)
+LOAD_ON_IMPORT = os.environ.get("LOAD_BUNDLE_ON_IMPORT", "") not in ("", "0")
+
+# Number of rendered tabs kept in the server-side figure cache
+TAB_CACHE_SIZE = int(os.environ.get("TAB_CACHE_SIZE", 32))
+
+# S3 prefix and local directory of the term bundles and their index
+BUNDLE_PREFIX = "bundle"
+
+# Archived term bundles kept loaded, by count and by size on disk; the current
+# term is always loaded
+TERM_CACHE_SIZE = 16
+TERM_CACHE_BYTES = int(os.environ.get("TERM_CACHE_BYTES", 256 * 1024 * 1024))
+
+# Bundle key and graph id of the prerendered figure shown on each tab
+TAB_FIGURES = {
+    "Heatmap": ("fig_map", "5"),
+    "Over Time": ("fig4", "1"),
+    "Total": ("fig2", "2"),
+    "Percent Max": ("fig", "3"),
+    "Percent Last Year": ("fig_old", "4"),
+    "Prior Years": ("fig_years", "6"),
+    "Forecast": ("fig_forecast", "7"),
+}
+
+# Bundle key of the figure behind each graph id, for resolving clicks
+GRAPH_FIGURES = {id_name: key for key, id_name in TAB_FIGURES.values()}
+
+# Local record of the ETag of each fetched object
+ETAG_FILE = "etags.json"
+
+# Dash routes whose request latency is exported on /metrics
+TIMED_ROUTES = {"/", "/_dash-layout", "/_dash-dependencies", "/_dash-update-component"}
+
+# Dash routes answered with an ETag, and 304 Not Modified when the copy is current
+CACHED_ROUTES = {"/_dash-layout", "/_dash-dependencies"}
+
+
 # Helper Functions
-def get_s3_data(object_name: str = "data.pickle"):
-    """Retrieve latest enrollment data from Amazon s3 bucket
-       and copy to Heroku local filesystem.
+class DirectoryS3Client:
+    """Stand-in for a boto3 S3 client that serves objects from a local directory.
+
+    Object keys are paths relative to the directory; the bucket name is ignored.
+    Like S3, get_object honors IfNoneMatch and raises ClientError for 304 and 404.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+
+    def get_object(
+        self, Bucket: Optional[str], Key: str, IfNoneMatch: Optional[str] = None
+    ) -> Dict[str, Any]:
+        path = self.root / Key
+        if not path.is_file():
+            raise ClientError(
+                {
+                    "Error": {"Code": "NoSuchKey", "Message": Key},
+                    "ResponseMetadata": {"HTTPStatusCode": 404},
+                },
+                "GetObject",
+            )
+
+        data = path.read_bytes()
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        if IfNoneMatch == etag:
+            raise ClientError(
+                {
+                    "Error": {"Code": "304", "Message": "Not Modified"},
+                    "ResponseMetadata": {"HTTPStatusCode": 304},
+                },
+                "GetObject",
+            )
+        return {"Body": io.BytesIO(data), "ETag": etag}
+
+
+def get_s3_client() -> Any:
+    """Create an S3 client, or a DirectoryS3Client if S3_LOCAL_DIR is set."""
+    if S3_LOCAL_DIR:
+        return DirectoryS3Client(S3_LOCAL_DIR)
+    return boto3.client("s3")
+
+
+def fetch_s3_object(s3_client: Any, key: str, etags: Dict[str, str]) -> Optional[bytes]:
+    """Fetch an S3 object into memory, unless the local copy is still current.
+
+    Args:
+        s3_client (Any): boto3 S3 client or stand-in
+        key (str): object key, which is also the local path of its copy
+        etags (Dict[str, str]): ETags of the local copies, updated in place
+
+    Returns:
+        Optional[bytes]: object content, or None if the ETag still matches.
+    """
+
+    kwargs = {"Bucket": AWS_BUCKET_NAME, "Key": key}
+    if key in etags and Path(key).is_file():
+        kwargs["IfNoneMatch"] = etags[key]
+
+    try:
+        response = s3_client.get_object(**kwargs)
+    except ClientError as error:
+        if error.response["ResponseMetadata"]["HTTPStatusCode"] == 304:
+            return None
+        raise
+
+    etags[key] = response["ETag"]
+    return response["Body"].read()
+
+
+def write_local_file(path: str, data: bytes) -> None:
+    """Helper method to replace a local file atomically."""
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as out_file:
+            out_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def get_s3_data(prefix: str = "bundle", s3_client: Any = None) -> bundle.Bundle:
+    """Retrieve latest enrollment bundle from Amazon s3 bucket
+       and open it for memory-mapped reads.
+
+    Local copies are tagged with their ETag, so unchanged objects are not
+    transferred again. Changed objects are read straight into memory and
+    written once to their local path; the manifest is written last.
+
+    Args:
+        prefix (str): S3 prefix and local directory of the bundle
+        s3_client (Any): boto3 S3 client or stand-in, created if not given
 
     Returns:
-        Dict[datetime.date,pd.DataFrame]
+        bundle.Bundle: mapping of data keys to lazily loaded dataframes.
     """
 
-    s3_client = boto3.client("s3")
-    s3_client.download_file(AWS_BUCKET_NAME, object_name, object_name)
+    if s3_client is None:
+        s3_client = get_s3_client()
+    Path(prefix).mkdir(parents=True, exist_ok=True)
+
+    etag_path = Path(prefix) / ETAG_FILE
+    etags = json.loads(etag_path.read_text()) if etag_path.is_file() else {}
+
+    with metrics.stage("get_s3_data") as record:
+        manifest_key = f"{prefix}/{bundle.MANIFEST}"
+        manifest_data = fetch_s3_object(s3_client, manifest_key, etags)
+
+        if manifest_data is not None:
+            for name in bundle.bundle_files(json.loads(manifest_data)):
+                key = f"{prefix}/{name}"
+                data = fetch_s3_object(s3_client, key, etags)
+                if data is not None:
+                    write_local_file(key, data)
+            write_local_file(manifest_key, manifest_data)
+            write_local_file(str(etag_path), json.dumps(etags).encode())
+
+        process_dict = bundle.read_bundle(prefix)
+        record["rows"] = sum(
+            entry.get("rows", 0) for entry in process_dict.manifest["entries"].values()
+        )
 
-    with open(object_name, "rb") as in_file:
-        process_dict = pickle.load(in_file)
     return process_dict
 
 
-# Run our data processing
-process_dict = get_s3_data()
-parse_dict = process_dict["parse_dict"]
-tester = process_dict["tester"]
-tester3 = process_dict["tester3"]
-old_df = process_dict["old_df"]
-old1 = process_dict["old1"]
-older = process_dict["older"]
-max_old = process_dict["max_old"]
-test_vs_old = process_dict["test_vs_old"]
-
-
-# Generate our graphs and tables
-fig4, fig2, fig = plotdata.generate_graphs(tester, tester3, older, max_old)
-fig_old = plotdata.generate_old_graph(test_vs_old)
-fig_map = plotdata.generate_heatmap(tester3)
-graph1 = plotdata.data_graph(fig4, "1")
-graph2 = plotdata.data_graph(fig2, "2")
-graph3 = plotdata.data_graph(fig, "3")
-graph4 = plotdata.data_graph(fig_old, "4")
-graph5 = plotdata.data_graph(fig_map, "5")
-
-latest_date = max(list(parse_dict.keys()))
-data_table = plotdata.create_dash_table(parse_dict[latest_date])
-
-# Package up data for layout
-graph_dict = {
-    "Heatmap": graph5,
-    "Over Time": graph1,
-    "Total": graph2,
-    "Percent Max": graph3,
-    "Percent Last Year": graph4,
-    "Latest Data": data_table,
-}
+def get_term_index(prefix: str = BUNDLE_PREFIX, s3_client: Any = None) -> Dict:
+    """Retrieve the index of the term bundles, unless the local copy is current.
+
+    Args:
+        prefix (str): S3 prefix and local directory of the term bundles
+        s3_client (Any): boto3 S3 client or stand-in, created if not given
+
+    Returns:
+        Dict: the current term and the bundle version of every term.
+    """
+
+    if s3_client is None:
+        s3_client = get_s3_client()
+    Path(prefix).mkdir(parents=True, exist_ok=True)
+
+    etag_path = Path(prefix) / ETAG_FILE
+    etags = json.loads(etag_path.read_text()) if etag_path.is_file() else {}
+
+    key = f"{prefix}/{bundle.TERM_INDEX}"
+    data = fetch_s3_object(s3_client, key, etags)
+    if data is not None:
+        write_local_file(key, data)
+        write_local_file(str(etag_path), json.dumps(etags).encode())
+        return json.loads(data)
+    return json.loads(Path(key).read_text())
+
+
+class LRUCache:
+    """Thread-safe mapping that keeps at most max_entries recently used items.
+
+    With max_bytes, items are also evicted while their total size is over it,
+    though the most recently used item is always kept.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return a cached item and mark it recently used, or None on a miss."""
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any, nbytes: int = 0) -> None:
+        """Cache an item, evicting the least recently used ones over the limits."""
+        with self._lock:
+            self.nbytes += nbytes - self._sizes.get(key, 0)
+            self._items[key] = value
+            self._sizes[key] = nbytes
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries or (
+                self.max_bytes is not None
+                and self.nbytes > self.max_bytes
+                and len(self._items) > 1
+            ):
+                evicted, _ = self._items.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
+
+
+def selected_term(search: Optional[str]) -> str:
+    """Return the term named in the URL query (?term=...), or the current term."""
+    index = term_index
+    term = parse_qs((search or "").lstrip("?")).get("term", [""])[0]
+    return term if term in index["terms"] else index["current"]
+
+
+def term_lock(term: str) -> Any:
+    """Helper method to return the lock that serializes loading a term's bundle."""
+    with term_locks_lock:
+        return term_locks.setdefault(term, threading.RLock())
+
+
+def load_term_bundle(index: Dict, term: str) -> bundle.Bundle:
+    """Fetch the version of a term's bundle named in the term index.
+
+    Each version has its own folder, so bundles still in use keep reading
+    their own files; versions superseded long enough ago are deleted.
+
+    Args:
+        index (Dict): term index from get_term_index
+        term (str): a term of the index, e.g. "Spring2021"
+
+    Returns:
+        bundle.Bundle: the term's enrollment data bundle.
+    """
+
+    version = index["terms"][term]
+    with term_lock(term):
+        term_bundle = get_s3_data(f"{BUNDLE_PREFIX}/{term}/{version}")
+        grace = max(bundle.STALE_SECONDS, 2 * REFRESH_INTERVAL)
+        bundle.remove_stale_versions(f"{BUNDLE_PREFIX}/{term}", version, grace)
+    return term_bundle
+
+
+def get_term_bundle(term: str) -> bundle.Bundle:
+    """Return a term's bundle, loading archived terms into the term cache.
+
+    Args:
+        term (str): a term of the term index, e.g. "Spring2021"
+
+    Returns:
+        bundle.Bundle: the term's enrollment data bundle.
+    """
+
+    index, current = term_index, process_dict
+    if term == index["current"]:
+        return current
+
+    term_bundle = term_cache.get(term)
+    if term_bundle is not None and term_bundle.version == index["terms"][term]:
+        return term_bundle
+
+    # Only one thread fetches a term; the others wait and take its bundle
+    with term_lock(term):
+        term_bundle = term_cache.get(term)
+        if term_bundle is None or term_bundle.version != index["terms"][term]:
+            term_bundle = load_term_bundle(index, term)
+            term_cache.put(term, term_bundle, term_bundle.nbytes)
+            logger.info("Loaded enrollment bundle for %s", term)
+    return term_bundle
+
+
+def build_tab(tab: str, process_dict: bundle.Bundle) -> Any:
+    """Create a tab's graph from its prerendered figure, or the data table.
+
+    Args:
+        tab (str): tab label, e.g. "Heatmap"
+        process_dict (bundle.Bundle): enrollment data bundle
+
+    Returns:
+        dash component for the tab content.
+    """
+
+    if tab == "Latest Data":
+        return layout.create_dash_table(process_dict["latest"])
+    key, id_name = TAB_FIGURES[tab]
+    return layout.data_graph(process_dict[key], id_name)
+
+
+def render_tab_content(tab: str, process_dict: bundle.Bundle) -> Any:
+    """Return a tab's content from the figure cache, building it on a miss.
+
+    Args:
+        tab (str): tab label, e.g. "Heatmap"
+        process_dict (bundle.Bundle): enrollment data bundle
+
+    Returns:
+        dash component for the tab content.
+    """
+
+    key = (tab, process_dict.version)
+    content = tab_cache.get(key)
+    if content is None:
+        content = build_tab(tab, process_dict)
+        tab_cache.put(key, content)
+    return content
+
+
+def build_layout(index: Dict) -> Any:
+    """Create the layout shell for a term index.
+
+    Args:
+        index (Dict): term index from get_term_index
+
+    Returns:
+        html.Div wrapping a website layout.
+    """
+
+    return layout.generate_layout(list(index["terms"]), index["current"])
+
+
+def refresh_layout() -> bool:
+    """Fetch the term index and current term bundle, and swap in a new layout if
+    either changed.
+
+    The new layout is built completely before app.layout is reassigned, so
+    requests see either the old layout or the new one.
+
+    Returns:
+        bool: True if a new layout was swapped in.
+    """
+
+    global process_dict, term_index, layout_version
+
+    new_index = get_term_index()
+    new_dict = load_term_bundle(new_index, new_index["current"])
+    new_version = hashlib.sha256(
+        f"{json.dumps(new_index, sort_keys=True)}{new_dict.version}".encode()
+    ).hexdigest()[:16]
+    if new_version == layout_version:
+        return False
+
+    with metrics.stage("build_layout"):
+        new_layout = build_layout(new_index)
+        render_tab_content(layout.TAB_LABELS[0], new_dict)
+    with metrics.stage("build_table_index") as record:
+        record["rows"] = len(get_table_index(new_dict).df)
+    term_index, process_dict = new_index, new_dict
+    app.layout = new_layout
+    layout_version = new_version
+    ready.set()
+    logger.info(
+        "Swapped in %s enrollment bundle version %s",
+        new_index["current"],
+        new_dict.version,
+    )
+    return True
+
+
+def load_bundle() -> None:
+    """Load the bundle now and render every tab into the caches.
+
+    Used before gunicorn forks its workers, so they all share one copy of the
+    data and figures. If loading fails, the workers' refreshers retry it.
+    """
+    try:
+        refresh_layout()
+    except Exception:
+        logger.exception("Loading the enrollment bundle failed")
+        return
+
+    current = process_dict
+    for tab in layout.TAB_LABELS:
+        render_tab_content(tab, current)
+
+
+def refresh_loop(interval: float) -> None:
+    """Load the bundle, then poll its version, refreshing the layout when it changes.
+
+    Until the first load succeeds it is retried every LOAD_RETRY_INTERVAL seconds.
+    With an interval of 0 the loop ends after the first successful load.
+    """
+    while True:
+        try:
+            refresh_layout()
+        except Exception:
+            logger.exception("Loading the enrollment bundle failed")
+        if not ready.is_set():
+            time.sleep(LOAD_RETRY_INTERVAL)
+        elif interval > 0:
+            time.sleep(interval)
+        else:
+            return
+
+
+def start_refresher(interval: float = REFRESH_INTERVAL) -> threading.Thread:
+    """Start the background thread that loads and then refreshes the bundle.
+
+    Args:
+        interval (float): seconds between polls of the bundle version
+
+    Returns:
+        threading.Thread: the daemon refresher thread.
+    """
+
+    thread = threading.Thread(
+        target=refresh_loop, args=(interval,), name="bundle-refresher", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+@app.callback(
+    Output("tab-content", "children"),
+    [Input("tabs", "active_tab"), Input("url", "search")],
+)
+def render_tab(active_tab: str, search: Optional[str]) -> Any:
+    """Render the active tab of the selected term on demand."""
+    if process_dict is None or active_tab not in layout.TAB_LABELS:
+        raise PreventUpdate
+    return render_tab_content(active_tab, get_term_bundle(selected_term(search)))
+
+
+@app.callback(
+    [
+        Output("nav-bar", "brand"),
+        Output("term-menu", "label"),
+        Output("data-version", "children"),
+    ],
+    [Input("url", "search")],
+)
+def show_term(search: Optional[str]) -> Tuple[str, str, str]:
+    """Title the page with the selected term and show its data version."""
+    if process_dict is None:
+        raise PreventUpdate
+    term = selected_term(search)
+    term_bundle = get_term_bundle(term)
+    return (
+        layout.nav_brand(term),
+        term,
+        f"Data {term_bundle.version}, updated {term_bundle.manifest['created']}",
+    )
+
+
+def get_table_index(process_dict: bundle.Bundle) -> datatable.TableIndex:
+    """Return the indexed latest snapshot of a bundle, building it on first use."""
+    table_index = table_cache.get(process_dict.version)
+    if table_index is None:
+        table_index = datatable.TableIndex(process_dict["latest"])
+        table_cache.put(process_dict.version, table_index)
+    return table_index
+
 
-# Create layout with graphs
-app.layout = layout.generate_layout(graph_dict, CURRENT_TERM)
+@app.callback(
+    [
+        Output("datatable-filtering", "data"),
+        Output("datatable-filtering", "page_count"),
+    ],
+    [
+        Input("datatable-filtering", "page_current"),
+        Input("datatable-filtering", "page_size"),
+        Input("datatable-filtering", "sort_by"),
+        Input("datatable-filtering", "filter_query"),
+    ],
+    [State("url", "search")],
+)
+def update_table(
+    page_current: int,
+    page_size: int,
+    sort_by: List[Dict[str, str]],
+    filter_query: str,
+    search: Optional[str],
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Serve one page of the selected term's Latest Data table."""
+    if process_dict is None:
+        raise PreventUpdate
+    term_bundle = get_term_bundle(selected_term(search))
+    return get_table_index(term_bundle).query(
+        page_current or 0, page_size, sort_by, filter_query
+    )
+
+
+def get_section_index(process_dict: bundle.Bundle) -> sections.SectionIndex:
+    """Return the section time series index of a bundle, building it on first use."""
+    section_index = section_cache.get(process_dict.version)
+    if section_index is None:
+        section_index = sections.SectionIndex(
+            process_dict["sections"], process_dict["section_axes"]
+        )
+        section_cache.put(process_dict.version, section_index)
+    return section_index
+
+
+def clicked_course(
+    point: Dict[str, Any], figure: Dict[str, Any], section_index: sections.SectionIndex
+) -> Optional[str]:
+    """Find the course of a clicked graph point.
+
+    Courses are the x values of bar graphs, the y values of the heatmap and the
+    trace names of the Over Time graph.
+
+    Args:
+        point (Dict[str, Any]): point from a graph's clickData
+        figure (Dict[str, Any]): prerendered figure of the graph
+        section_index (sections.SectionIndex): sections of the term
+
+    Returns:
+        Optional[str]: the course, or None if the point is not a course.
+    """
+
+    traces = figure["data"]
+    curve = point.get("curveNumber")
+    name = traces[curve].get("name") if curve in range(len(traces)) else None
+    for candidate in (point.get("x"), point.get("y"), name):
+        if isinstance(candidate, str) and candidate in section_index:
+            return candidate
+    return None
+
+
+@app.callback(
+    [
+        Output("section-modal", "is_open"),
+        Output("section-title", "children"),
+        Output("section-graph", "figure"),
+    ],
+    [Input({"type": "tab-graph", "index": ALL}, "clickData")],
+    [State("url", "search")],
+)
+def show_sections(clicks: List[Optional[Dict]], search: Optional[str]) -> Tuple:
+    """Open the sections of a course clicked on any graph."""
+    triggered = dash.callback_context.triggered
+    if process_dict is None or not triggered or not triggered[0]["value"]:
+        raise PreventUpdate
+
+    graph_id = json.loads(triggered[0]["prop_id"].rsplit(".", 1)[0])
+    term_bundle = get_term_bundle(selected_term(search))
+    section_index = get_section_index(term_bundle)
+    figure = term_bundle[GRAPH_FIGURES[graph_id["index"]]]
+    course = clicked_course(triggered[0]["value"]["points"][0], figure, section_index)
+    if course is None:
+        raise PreventUpdate
+
+    crns, series = section_index.course(course)
+    return (
+        True,
+        f"{course}: {len(crns)} section{'' if len(crns) == 1 else 's'}",
+        drilldown.generate_section_graph(course, crns, section_index.dates, series),
+    )
+
+
+@server.before_request
+def start_request_timer() -> None:
+    """Note when a request started, for the latency histogram."""
+    flask.g.request_start = time.perf_counter()
+
+
+@server.after_request
+def observe_request_latency(response: Any) -> Any:
+    """Record the latency of Dash layout and callback requests."""
+    start = flask.g.get("request_start")
+    if start is not None and flask.request.path in TIMED_ROUTES:
+        output = ""
+        if flask.request.path == "/_dash-update-component":
+            output = (flask.request.get_json(silent=True) or {}).get("output", "")
+        metrics.REQUEST_LATENCY.observe(
+            (flask.request.path, output), time.perf_counter() - start
+        )
+    return response
+
+
+def route_etag(path: str) -> str:
+    """Return the strong ETag of a cached route's current response.
+
+    The layout is tagged with the term index and bundle it was built from; the
+    callback list only changes with the code, so it is tagged with its hash.
+
+    Args:
+        path (str): one of CACHED_ROUTES
+
+    Returns:
+        str: unquoted ETag.
+    """
+
+    if path == "/_dash-layout":
+        return f"layout-{layout_version or 'loading'}"
+
+    global dependencies_etag
+    if dependencies_etag is None:
+        callbacks = json.dumps(app._callback_list, sort_keys=True).encode()
+        dependencies_etag = f"deps-{hashlib.sha256(callbacks).hexdigest()[:16]}"
+    return dependencies_etag
+
+
+@server.before_request
+def answer_conditional_request() -> Any:
+    """Answer 304 Not Modified when the browser's copy of a cached route is current."""
+    if flask.request.method != "GET" or flask.request.path not in CACHED_ROUTES:
+        return None
+
+    etag = flask.g.etag = route_etag(flask.request.path)
+    # Flask-Compress may suffix the ETag with the encoding, e.g. "layout-...:br"
+    client_tags = {tag.split(":")[0] for tag in flask.request.if_none_match.as_set()}
+    if etag in client_tags:
+        return flask.Response(
+            status=304, headers={"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+        )
+    return None
+
+
+@server.after_request
+def tag_cached_response(response: Any) -> Any:
+    """Attach the ETag to full responses of cached routes, to be revalidated."""
+    etag = flask.g.get("etag")
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@server.route("/metrics")
+def prometheus_metrics() -> Any:
+    """Stage timings, memory and request latencies in Prometheus text format."""
+    return (
+        metrics.render_metrics(),
+        200,
+        {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+@server.route("/healthz")
+def healthz() -> Any:
+    """Liveness check: the server is up and answering requests."""
+    return "ok", 200, {"Content-Type": "text/plain"}
+
+
+@server.route("/readyz")
+def readyz() -> Any:
+    """Readiness check: the enrollment data is loaded and the dashboard is built."""
+    if ready.is_set():
+        return "ready", 200, {"Content-Type": "text/plain"}
+    return "loading", 503, {"Content-Type": "text/plain"}
+
+
+# Serve a placeholder until the data is loaded in the background
+process_dict: Optional[bundle.Bundle] = None
+term_index: Dict = {"current": "", "terms": {}}
+layout_version: Optional[str] = None
+dependencies_etag: Optional[str] = None
+ready = threading.Event()
+tab_cache = LRUCache(TAB_CACHE_SIZE)
+table_cache = LRUCache(4)
+section_cache = LRUCache(4)
+term_cache = LRUCache(TERM_CACHE_SIZE, max_bytes=TERM_CACHE_BYTES)
+term_locks: Dict[str, Any] = {}
+term_locks_lock = threading.Lock()
+app.layout = layout.generate_placeholder_layout("")
+app.clientside_callback(
+    """
+    function(n_intervals) {
+        fetch("/readyz").then(function(response) {
+            if (response.ok) { window.location.reload(); }
+        });
+        return "";
+    }
+    """,
+    Output("loading-status", "children"),
+    Input("loading-interval", "n_intervals"),
+)
+if LOAD_ON_IMPORT:
+    load_bundle()
+    refresher: Optional[threading.Thread] = None
+else:
+    refresher = start_refresher()
 
 
 # Main
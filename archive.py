@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""Embedded SQLite archive of section-level enrollment snapshots.
+
+Every processed SWRCGSR workbook is stored once, as one row per section, so
+history across terms can be queried without re-reading Excel. The newest
+workbook of each term is also kept whole, for the Latest Data table. E.g.
+
+    with archive.connect("archive.sqlite") as conn:
+        archive.enrollment_before(conn, "CHE1800", term_starts, days=30)
+"""
+
+# Import required libraries
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, timedelta
+from itertools import repeat
+import sqlite3
+import pandas as pd
+
+# Module imports
+import bundle
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    term TEXT NOT NULL,
+    date TEXT NOT NULL,
+    crn INTEGER,
+    course TEXT,
+    enrolled INTEGER,
+    max INTEGER,
+    waitlist INTEGER,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_term_course_date
+    ON snapshots (term, course, date);
+CREATE INDEX IF NOT EXISTS snapshots_crn_date ON snapshots (crn, date);
+CREATE TABLE IF NOT EXISTS workbooks (
+    term TEXT NOT NULL,
+    date TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (term, date)
+);
+CREATE TABLE IF NOT EXISTS latest_workbooks (
+    term TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    arrow BLOB NOT NULL
+);
+"""
+
+# Workbook column stored in each snapshots column, after term and date
+WORKBOOK_COLUMNS = {
+    "crn": "CRN",
+    "course": "Course",
+    "enrolled": "Enrolled",
+    "max": "Max",
+    "waitlist": "WList",
+    "status": "S",
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the archive, creating its tables and indexes if needed.
+
+    Args:
+        path (str): SQLite database file
+
+    Returns:
+        sqlite3.Connection: use "with conn:" to group writes in a transaction.
+    """
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _column(df: pd.DataFrame, name: str) -> List:
+    """Helper method to convert a workbook column to SQLite values, NaN as NULL."""
+    if name not in df.columns:
+        return [None] * len(df)
+    values = df[name].astype(object).where(df[name].notna(), None)
+    return [value.item() if hasattr(value, "item") else value for value in values]
+
+
+def workbook_digests(conn: sqlite3.Connection, term: str) -> Dict[date, str]:
+    """Return the content digest of every archived workbook of a term.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+
+    Returns:
+        Dict[datetime.date, str]: digests keyed by snapshot date.
+    """
+
+    rows = conn.execute(
+        "SELECT date, digest FROM workbooks WHERE term = ?", (term,)
+    ).fetchall()
+    return {date.fromisoformat(day): digest for day, digest in rows}
+
+
+def delete_snapshots(
+    conn: sqlite3.Connection, term: str, dates: Iterable[date]
+) -> None:
+    """Remove the snapshots of a term taken on the given dates.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+        dates (Iterable[datetime.date]): snapshot dates to remove
+    """
+
+    keys = [(term, day.isoformat()) for day in dates]
+    conn.executemany("DELETE FROM snapshots WHERE term = ? AND date = ?", keys)
+    conn.executemany("DELETE FROM workbooks WHERE term = ? AND date = ?", keys)
+
+
+def load_snapshots(
+    conn: sqlite3.Connection,
+    term: str,
+    parse_dict: Dict[date, pd.DataFrame],
+    digests: Dict[date, str],
+) -> int:
+    """Store parsed workbooks, replacing any earlier copy of the same snapshots.
+
+    Call inside "with conn:" so the whole load is one transaction.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+        parse_dict (Dict[datetime.date, pd.DataFrame]): parsed workbooks
+        digests (Dict[datetime.date, str]): content digest of each workbook
+
+    Returns:
+        int: number of section rows stored.
+    """
+
+    delete_snapshots(conn, term, parse_dict)
+
+    rows = 0
+    for day, df in parse_dict.items():
+        columns = [_column(df, name) for name in WORKBOOK_COLUMNS.values()]
+        conn.executemany(
+            "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(repeat(term), repeat(day.isoformat()), *columns),
+        )
+        rows += len(df)
+
+    conn.executemany(
+        "INSERT INTO workbooks VALUES (?, ?, ?)",
+        [(term, day.isoformat(), digests[day]) for day in parse_dict],
+    )
+    return rows
+
+
+def store_latest(
+    conn: sqlite3.Connection, term: str, day: date, df: pd.DataFrame
+) -> None:
+    """Keep a term's newest parsed workbook whole, replacing the previous one.
+
+    The workbook is stored as an Arrow IPC stream, which stays readable across
+    pandas versions.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+        day (datetime.date): snapshot date of the workbook
+        df (pd.DataFrame): parsed workbook, with every column
+    """
+
+    conn.execute(
+        "INSERT OR REPLACE INTO latest_workbooks VALUES (?, ?, ?)",
+        (term, day.isoformat(), bundle.frame_to_bytes(df)),
+    )
+
+
+def latest_date(conn: sqlite3.Connection, term: str) -> Optional[date]:
+    """Return the date of a term's stored newest workbook, if there is one."""
+    row = conn.execute(
+        "SELECT date FROM latest_workbooks WHERE term = ?", (term,)
+    ).fetchone()
+    return date.fromisoformat(row[0]) if row else None
+
+
+def latest_snapshot(
+    conn: sqlite3.Connection, term: str
+) -> Optional[Tuple[date, pd.DataFrame]]:
+    """Return a term's newest workbook as stored by store_latest.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+
+    Returns:
+        Optional[Tuple[datetime.date, pd.DataFrame]]: snapshot date and parsed
+            workbook, or None if the term has none.
+    """
+
+    row = conn.execute(
+        "SELECT date, arrow FROM latest_workbooks WHERE term = ?", (term,)
+    ).fetchone()
+    if row is None:
+        return None
+    return date.fromisoformat(row[0]), bundle.frame_from_bytes(row[1])
+
+
+def _frame(conn: sqlite3.Connection, query: str, params: tuple) -> pd.DataFrame:
+    """Helper method to run a query into a dataframe with date objects."""
+    cursor = conn.execute(query, params)
+    df = pd.DataFrame(
+        cursor.fetchall(), columns=[column[0] for column in cursor.description]
+    )
+    if "Date" in df.columns:
+        days = {day: date.fromisoformat(day) for day in df["Date"].unique()}
+        df["Date"] = df["Date"].map(days)
+    return df
+
+
+def terms(conn: sqlite3.Connection) -> List[str]:
+    """List the archived terms."""
+    return [
+        row[0] for row in conn.execute("SELECT DISTINCT term FROM workbooks ORDER BY 1")
+    ]
+
+
+def fact_table(conn: sqlite3.Connection, term: str) -> pd.DataFrame:
+    """Return a term's snapshots as a long-format fact table.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+
+    Returns:
+        pd.DataFrame: one row per section per snapshot, with columns
+                      Date, CRN, Course, Enrolled and Max.
+    """
+
+    df = _frame(
+        conn,
+        "SELECT date AS Date, crn AS CRN, course AS Course, enrolled AS Enrolled,"
+        " max AS Max FROM snapshots WHERE term = ? ORDER BY date, rowid",
+        (term,),
+    )
+    for column in ["CRN", "Enrolled", "Max"]:
+        df[column] = pd.to_numeric(df[column])
+    return df
+
+
+def section_snapshots(conn: sqlite3.Connection, term: str) -> pd.DataFrame:
+    """Return every snapshot of a term's sections, with waitlists.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        term (str): term, e.g. "Spring2021"
+
+    Returns:
+        pd.DataFrame: Date, CRN, Course, Enrolled, WList and Max columns.
+    """
+
+    return _frame(
+        conn,
+        "SELECT date AS Date, crn AS CRN, course AS Course, enrolled AS Enrolled,"
+        " waitlist AS WList, max AS Max FROM snapshots WHERE term = ?"
+        " ORDER BY date, rowid",
+        (term,),
+    )
+
+
+def course_history(
+    conn: sqlite3.Connection, course: str, term_names: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Total a course's sections at every snapshot of every (or the given) term.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        course (str): course, e.g. "CHE1800"
+        term_names (Optional[List[str]]): terms to include, all if not given
+
+    Returns:
+        pd.DataFrame: Term, Date, Sections, Enrolled, Max and WList columns.
+    """
+
+    query = (
+        "SELECT term AS Term, date AS Date, COUNT(*) AS Sections,"
+        " SUM(enrolled) AS Enrolled, SUM(max) AS Max, SUM(waitlist) AS WList"
+        " FROM snapshots WHERE course = ?"
+    )
+    params: tuple = (course,)
+    if term_names is not None:
+        query += f" AND term IN ({', '.join('?' * len(term_names))})"
+        params += tuple(term_names)
+    return _frame(conn, query + " GROUP BY term, date ORDER BY term, date", params)
+
+
+def crn_history(conn: sqlite3.Connection, crn: int) -> pd.DataFrame:
+    """Return every archived snapshot of one section.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        crn (int): section CRN
+
+    Returns:
+        pd.DataFrame: Term, Date, Course, Enrolled, Max, WList and S columns.
+    """
+
+    return _frame(
+        conn,
+        "SELECT term AS Term, date AS Date, course AS Course, enrolled AS Enrolled,"
+        " max AS Max, waitlist AS WList, status AS S FROM snapshots"
+        " WHERE crn = ? ORDER BY date",
+        (crn,),
+    )
+
+
+def enrollment_before(
+    conn: sqlite3.Connection, course: str, term_starts: Dict[str, date], days: int
+) -> pd.DataFrame:
+    """Find a course's enrollment a number of days before each term started.
+
+    For each term the last snapshot on or before that day is used.
+
+    Args:
+        conn (sqlite3.Connection): archive connection
+        course (str): course, e.g. "CHE1800"
+        term_starts (Dict[str, datetime.date]): first day of each term to include
+        days (int): days before the start
+
+    Returns:
+        pd.DataFrame: one course_history row per term that has such a snapshot.
+    """
+
+    history = course_history(conn, course, list(term_starts))
+    cutoff = history["Term"].map(
+        {term: start - timedelta(days=days) for term, start in term_starts.items()}
+    )
+    before = history[history["Date"] <= cutoff]
+    return before.groupby("Term").tail(1).reset_index(drop=True)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""Compare the per-trace and bulk construction of the enrollment bar graphs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_bar_graphs
+
+The per-trace build grows quadratically with the course count (10 to 15 s at
+300 courses, some 20 minutes at 3000), so above --max-loop-courses its time is
+extrapolated from the largest course count it ran at, and marked as such.
+Pass a larger --max-loop-courses to measure it instead.
+"""
+
+# Import required libraries
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Module imports
+import plotdata
+from benchmarks.synthetic import synthetic_tables
+
+
+def loop_bar_graph(df: pd.DataFrame, baseline: pd.DataFrame) -> Any:
+    """Build a bar graph the original way, one validated add_* call at a time."""
+    fig = go.Figure()
+    for i in range(plotdata.BAR_SNAPSHOTS):
+        fig.add_trace(
+            go.Bar(
+                x=df.index,
+                y=df.iloc[:, i],
+                name=df.columns[i].strftime("%Y-%m-%d"),
+                marker_color=px.colors.sequential.Turbo_r[i],
+            )
+        )
+
+    for i in range(len(baseline.index)):
+        if baseline.index[i] in df.index:
+            ind = list(df.index).index(baseline.index[i])
+            fig.add_shape(
+                type="line",
+                x0=ind - 0.4,
+                y0=baseline.iloc[i, 0],
+                x1=ind + 0.4,
+                y1=baseline.iloc[i, 0],
+                opacity=1,
+                line=dict(color="Magenta", width=3),
+            )
+
+    fig.update_layout(
+        barmode="overlay",
+        colorscale={"sequential": px.colors.sequential.Turbo_r},
+        template="ggplot2",
+        title="Student total enrollment over time",
+        yaxis_title="Student Count",
+    )
+    return fig
+
+
+def bulk_bar_graph(df: pd.DataFrame, baseline: pd.DataFrame) -> Any:
+    """Build a bar graph with plotdata.generate_bar_graph."""
+    return plotdata.generate_bar_graph(df, baseline, "Student Count")
+
+
+def best_time(build: Callable[[], Any], repeat: int) -> float:
+    """Helper method to return the best wall time of build() in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(
+    scales: List[int], n_dates: int, repeat: int, max_loop_courses: int
+) -> List[Dict[str, Any]]:
+    """Run the benchmark at several course counts.
+
+    Args:
+        scales (List[int]): course counts to benchmark
+        n_dates (int): snapshots per course
+        repeat (int): timing repetitions, the best is kept
+        max_loop_courses (int): largest course count for the per-trace build
+
+    Returns:
+        List[Dict[str, Any]]: one result per scale; loop_extrapolated is True
+            where loop_seconds is extrapolated rather than measured.
+    """
+
+    results = []
+    measured = None
+    for n_courses in sorted(scales):
+        tables = synthetic_tables(n_courses, n_dates)
+        df, baseline = tables["tester"], tables["older"]
+
+        bulk_seconds = best_time(lambda: bulk_bar_graph(df, baseline), repeat)
+        loop_seconds = None
+        if n_courses <= max_loop_courses:
+            start = time.perf_counter()
+            loop = loop_bar_graph(df, baseline)
+            loop_seconds = time.perf_counter() - start
+            measured = (n_courses, loop_seconds)
+            bulk = bulk_bar_graph(df, baseline)
+            if json.loads(loop.to_json()) != json.loads(bulk.to_json()):
+                raise AssertionError(f"bar graphs differ at {n_courses} courses")
+        elif measured is not None:
+            # The per-trace build is quadratic in the course count
+            loop_seconds = measured[1] * (n_courses / measured[0]) ** 2
+
+        results.append(
+            {
+                "courses": n_courses,
+                "loop_seconds": loop_seconds,
+                "loop_extrapolated": bool(loop_seconds)
+                and n_courses > max_loop_courses,
+                "bulk_seconds": bulk_seconds,
+                "speedup": loop_seconds / bulk_seconds if loop_seconds else None,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[34, 300, 3000])
+    parser.add_argument("--dates", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-loop-courses", type=int, default=300)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.dates, args.repeat, args.max_loop_courses)
+    if args.json:
+        print(json.dumps(results, indent=1))
+    else:
+        print(f"{'courses':>8} {'loop ms':>10} {'bulk ms':>10} {'speedup':>8}")
+        for row in results:
+            if row["loop_seconds"] is None:
+                loop, speedup = f"{'skipped':>10}", f"{'-':>8}"
+            else:
+                loop = f"{row['loop_seconds'] * 1000:>10.1f}"
+                speedup = f"{row['speedup']:>7.1f}x"
+            note = "  (loop extrapolated)" if row["loop_extrapolated"] else ""
+            print(
+                f"{row['courses']:>8} {loop}"
+                f" {row['bulk_seconds'] * 1000:>10.1f} {speedup}{note}"
+            )
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Compare JSON and binary typed-array figure payloads.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_figure_encoding
+"""
+
+# Import required libraries
+from typing import Any, Dict, List
+import argparse
+import json
+import time
+
+# Module imports
+import plotdata
+from benchmarks.synthetic import synthetic_tables
+
+
+def build_figures(tables: Dict[str, Any]) -> Dict[str, Any]:
+    """Build every dashboard figure from synthetic tables."""
+    fig4, fig2, fig = plotdata.generate_graphs(
+        tables["tester"], tables["tester3"], tables["older"], tables["max_old"]
+    )
+    return {
+        "fig4": fig4,
+        "fig2": fig2,
+        "fig": fig,
+        "fig_old": plotdata.generate_old_graph(tables["test_vs_old"]),
+        "fig_map": plotdata.generate_heatmap(tables["tester3"]),
+    }
+
+
+def time_encoding(fig: Any, binary: bool, repeat: int) -> Dict[str, float]:
+    """Helper method to measure the payload bytes and best serialization time."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = plotdata.figure_to_json(fig, binary=binary)
+        best = min(best, time.perf_counter() - start)
+    return {"bytes": len(payload.encode()), "seconds": best}
+
+
+def run(scales: List[int], n_dates: int, repeat: int) -> List[Dict[str, Any]]:
+    """Run the benchmark at several course counts.
+
+    Args:
+        scales (List[int]): course counts to benchmark
+        n_dates (int): snapshots per course
+        repeat (int): timing repetitions, the best is kept
+
+    Returns:
+        List[Dict[str, Any]]: one result per figure and scale.
+    """
+
+    results = []
+    for n_courses in scales:
+        figures = build_figures(synthetic_tables(n_courses, n_dates))
+        for name, fig in figures.items():
+            as_json = time_encoding(fig, False, repeat)
+            as_binary = time_encoding(fig, True, repeat)
+            results.append(
+                {
+                    "courses": n_courses,
+                    "figure": name,
+                    "json_bytes": as_json["bytes"],
+                    "binary_bytes": as_binary["bytes"],
+                    "json_seconds": as_json["seconds"],
+                    "binary_seconds": as_binary["seconds"],
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[34, 300, 3000])
+    parser.add_argument("--dates", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.dates, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=1))
+    else:
+        print(
+            f"{'courses':>8} {'figure':>8} {'json kB':>9} {'binary kB':>10}"
+            f" {'ratio':>6} {'json ms':>8} {'binary ms':>10}"
+        )
+        for row in results:
+            print(
+                f"{row['courses']:>8} {row['figure']:>8}"
+                f" {row['json_bytes'] / 1024:>9.1f}"
+                f" {row['binary_bytes'] / 1024:>10.1f}"
+                f" {row['binary_bytes'] / row['json_bytes']:>6.2f}"
+                f" {row['json_seconds'] * 1000:>8.1f}"
+                f" {row['binary_seconds'] * 1000:>10.1f}"
+            )
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""Time every pipeline stage and track its peak memory on synthetic workbooks.
+
+Run from the repository root; results are saved as JSON so runs on different
+commits can be compared:
+
+    python -m benchmarks.bench_pipeline --scale 34:16 300:30 --output bench.json
+
+Each scale is COURSES:SNAPSHOTS. Stages are timed first, then run again under
+tracemalloc for their peak Python memory.
+"""
+
+# Import required libraries
+from typing import Any, Callable, Dict, List, Tuple
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+# Module imports
+import archive
+import cube
+import datatable
+import layout
+import plotdata
+import process
+from benchmarks.workbooks import write_dataset
+
+# A table query like the ones the Latest Data tab sends
+TABLE_SORT = [{"column_id": "Enrolled", "direction": "desc"}]
+TABLE_FILTER = "{Course} contains 1 && {Max} > 20"
+
+
+def pipeline_stages(workers: int) -> List[Tuple[str, Callable[[Dict], Any]]]:
+    """List the pipeline stages in order, each reading earlier stage results.
+
+    Args:
+        workers (int): parser processes for process.archive_term
+
+    Returns:
+        List[Tuple[str, Callable[[Dict], Any]]]: stage names and functions.
+    """
+
+    def archive_term(term: str) -> Any:
+        # A fresh archive each run, so reruns parse every workbook again
+        conn = archive.connect(":memory:")
+        process.archive_term(conn, term, workers=workers)
+        return conn
+
+    def latest(state: Dict[str, Any]) -> Any:
+        _, df = archive.latest_snapshot(state["archive_current"], process.CURRENT_TERM)
+        return df
+
+    def build_cube(state: Dict[str, Any]) -> Any:
+        terms = [process.CURRENT_TERM, process.PREVIOUS_TERM]
+        facts = dict(zip(terms, [state["fact_current"], state["fact_previous"]]))
+        starts = {term: cube.term_start(term) for term in terms}
+        return cube.build_cube(facts, starts, process.COURSE_RENAMES)
+
+    return [
+        ("archive_current", lambda s: archive_term(process.CURRENT_TERM)),
+        ("archive_previous", lambda s: archive_term(process.PREVIOUS_TERM)),
+        (
+            "fact_current",
+            lambda s: archive.fact_table(s["archive_current"], process.CURRENT_TERM),
+        ),
+        (
+            "fact_previous",
+            lambda s: archive.fact_table(s["archive_previous"], process.PREVIOUS_TERM),
+        ),
+        ("process_data", lambda s: process.process_data(s["fact_current"])),
+        (
+            "process_df_to_counts",
+            lambda s: process.process_df_to_counts(s["fact_previous"]),
+        ),
+        ("process_max_old", lambda s: process.process_max_old(s["fact_previous"])),
+        (
+            "process_vs_old",
+            lambda s: process.process_vs_old(s["fact_current"], s["fact_previous"]),
+        ),
+        (
+            "generate_graphs",
+            lambda s: plotdata.generate_graphs(
+                *s["process_data"], s["process_df_to_counts"], s["process_max_old"]
+            ),
+        ),
+        (
+            "generate_old_graph",
+            lambda s: plotdata.generate_old_graph(s["process_vs_old"]),
+        ),
+        (
+            "generate_heatmap",
+            lambda s: plotdata.generate_heatmap(s["process_data"][1]),
+        ),
+        ("build_cube", build_cube),
+        (
+            "generate_prior_years_graph",
+            lambda s: plotdata.generate_prior_years_graph(*s["build_cube"]),
+        ),
+        (
+            "build_forecast",
+            lambda s: process.build_forecast(*s["build_cube"], s["fact_current"]),
+        ),
+        (
+            "generate_forecast_graph",
+            lambda s: plotdata.generate_forecast_graph(s["build_forecast"][0]),
+        ),
+        ("highlight_flags", lambda s: datatable.highlight_flags(latest(s))),
+        ("create_dash_table", lambda s: layout.create_dash_table(s["highlight_flags"])),
+        ("table_index", lambda s: datatable.TableIndex(s["highlight_flags"])),
+        (
+            "table_query",
+            lambda s: s["table_index"].query(
+                0, layout.TABLE_PAGE_SIZE, TABLE_SORT, TABLE_FILTER
+            ),
+        ),
+    ]
+
+
+def run_scale(
+    n_courses: int, n_snapshots: int, max_sections: int, workers: int, memory: bool
+) -> List[Dict[str, Any]]:
+    """Generate a dataset and measure every stage on it.
+
+    Args:
+        n_courses (int): number of courses
+        n_snapshots (int): snapshots per term
+        max_sections (int): each course has 1 to max_sections sections
+        workers (int): parser processes for process.archive_term
+        memory (bool): also measure peak memory under tracemalloc
+
+    Returns:
+        List[Dict[str, Any]]: one result per stage.
+    """
+
+    home = Path.cwd()
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_dataset(Path(root), n_courses, max_sections, n_snapshots)
+        rows = len(process.read_workbook(paths[0]))
+        # process.py finds its workbooks under the working directory
+        os.chdir(root)
+        try:
+            stages = pipeline_stages(workers)
+            state: Dict[str, Any] = {}
+            results = []
+            for name, stage in stages:
+                start = time.perf_counter()
+                state[name] = stage(state)
+                results.append(
+                    {
+                        "courses": n_courses,
+                        "snapshots": n_snapshots,
+                        "sections": rows,
+                        "stage": name,
+                        "seconds": time.perf_counter() - start,
+                        "peak_bytes": None,
+                    }
+                )
+
+            if memory:
+                for result, (_, stage) in zip(results, stages):
+                    tracemalloc.start()
+                    stage(state)
+                    result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+        finally:
+            os.chdir(home)
+
+    return results
+
+
+def git_commit() -> str:
+    """Helper method to return the checked out commit, or "" outside git."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def parse_scale(scale: str) -> Tuple[int, int]:
+    """Helper method to parse a COURSES:SNAPSHOTS scale point."""
+    courses, _, snapshots = scale.partition(":")
+    return int(courses), int(snapshots or 16)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scale", type=parse_scale, nargs="+", default=[(34, 16), (300, 30)]
+    )
+    parser.add_argument("--sections", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for n_courses, n_snapshots in args.scale:
+        results += run_scale(
+            n_courses, n_snapshots, args.sections, args.workers, not args.no_memory
+        )
+
+    print(f"{'courses':>8} {'snaps':>6} {'stage':>22} {'ms':>10} {'peak MB':>9}")
+    for row in results:
+        peak = row["peak_bytes"]
+        print(
+            f"{row['courses']:>8} {row['snapshots']:>6} {row['stage']:>22}"
+            f" {row['seconds'] * 1000:>10.1f}"
+            f" {'-' if peak is None else f'{peak / 2 ** 20:.1f}':>9}"
+        )
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=1))
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""Check that preloaded gunicorn workers share the enrollment data copy-on-write.
+
+Starts gunicorn with gunicorn.conf.py (preload) and, for comparison, without
+it, sends every tab and a table page to the workers, then reads each worker's
+/proc/<pid>/smaps_rollup (Linux only). Run from the repository root with a
+bundle to serve, e.g.:
+
+    S3_LOCAL_DIR=/path/to/s3 python -m benchmarks.check_shared_memory --workers 4
+
+Exits with status 1 if preloaded workers keep less than --min-shared of their
+resident memory shared.
+"""
+
+# Import required libraries
+from typing import Any, Dict, List
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Module imports
+import layout
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONFIG = REPO_ROOT / "gunicorn.conf.py"
+
+# smaps_rollup fields reported, in kB
+MEMORY_FIELDS = [
+    "Rss",
+    "Pss",
+    "Shared_Clean",
+    "Shared_Dirty",
+    "Private_Clean",
+    "Private_Dirty",
+]
+
+# Output id of the Latest Data table callback, which has two outputs
+TABLE_OUTPUT = "..datatable-filtering.data...datatable-filtering.page_count.."
+
+# URL query of the page, which selects the current term
+URL_SEARCH = {"id": "url", "property": "search", "value": ""}
+
+
+def free_port() -> int:
+    """Helper method to find a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def gunicorn_command() -> List[str]:
+    """Helper method to find the gunicorn script, preferring this interpreter's."""
+    script = shutil.which(
+        "gunicorn", path=os.path.dirname(sys.executable)
+    ) or shutil.which("gunicorn")
+    if script is None:
+        raise FileNotFoundError("gunicorn is not installed")
+    return [script]
+
+
+def wait_ready(base_url: str, server: subprocess.Popen, timeout: float) -> None:
+    """Helper method to wait until /readyz answers 200, or the server exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(
+                f"gunicorn exited with status {server.returncode} before it was ready"
+            )
+        try:
+            with urllib.request.urlopen(f"{base_url}/readyz") as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{base_url} was not ready within {timeout} s")
+
+
+def post_callback(base_url: str, body: Dict[str, Any]) -> None:
+    """Helper method to send a Dash callback request."""
+    request = urllib.request.Request(
+        f"{base_url}/_dash-update-component",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def exercise(base_url: str, rounds: int) -> None:
+    """Request the layout, every tab and a table page, rounds times each.
+
+    Args:
+        base_url (str): server address, e.g. "http://127.0.0.1:8000"
+        rounds (int): repetitions, so every worker gets some requests
+    """
+
+    for _ in range(rounds):
+        with urllib.request.urlopen(f"{base_url}/_dash-layout") as response:
+            response.read()
+        for tab in layout.TAB_LABELS:
+            inputs = [
+                {"id": "tabs", "property": "active_tab", "value": tab},
+                URL_SEARCH,
+            ]
+            post_callback(
+                base_url,
+                {
+                    "output": "tab-content.children",
+                    "outputs": {"id": "tab-content", "property": "children"},
+                    "inputs": inputs,
+                    "changedPropIds": ["tabs.active_tab"],
+                },
+            )
+
+        table_props = ["page_current", "page_size", "sort_by", "filter_query"]
+        table_values = [0, layout.TABLE_PAGE_SIZE, [], ""]
+        post_callback(
+            base_url,
+            {
+                "output": TABLE_OUTPUT,
+                "outputs": [
+                    {"id": "datatable-filtering", "property": "data"},
+                    {"id": "datatable-filtering", "property": "page_count"},
+                ],
+                "inputs": [
+                    {"id": "datatable-filtering", "property": prop, "value": value}
+                    for prop, value in zip(table_props, table_values)
+                ],
+                "state": [URL_SEARCH],
+                "changedPropIds": ["datatable-filtering.page_current"],
+            },
+        )
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    """Helper method to list the child processes of the gunicorn master."""
+    pids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(stat.parent.name))
+    return sorted(pids)
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """Read the resident, proportional, shared and private memory of a process.
+
+    Args:
+        pid (int): process id
+
+    Returns:
+        Dict[str, int]: MEMORY_FIELDS in kB.
+    """
+
+    memory = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        name, _, value = line.partition(":")
+        if name in MEMORY_FIELDS:
+            memory[name] = int(value.split()[0])
+    return memory
+
+
+def measure(preload: bool, workers: int, rounds: int, timeout: float) -> List[Dict]:
+    """Start gunicorn, exercise it and measure the memory of each worker.
+
+    Args:
+        preload (bool): use gunicorn.conf.py, otherwise each worker loads the data
+        workers (int): number of workers
+        rounds (int): request rounds sent before measuring
+        timeout (float): seconds to wait for the data to load
+
+    Returns:
+        List[Dict]: memory of each worker, in kB.
+    """
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        command = gunicorn_command() + ["--workers", str(workers)]
+        command += ["--bind", f"127.0.0.1:{port}", "--pythonpath", str(REPO_ROOT)]
+        if preload:
+            command += ["--config", str(CONFIG)]
+        log_path = Path(workdir) / "gunicorn.log"
+        # Outside the repository, so gunicorn.conf.py is only used when asked for
+        with open(log_path, "wb") as log:
+            server = subprocess.Popen(command + ["app:server"], cwd=workdir, stderr=log)
+        try:
+            wait_ready(base_url, server, timeout)
+            if not preload:
+                # Every worker loads on its own; give them all time to finish
+                time.sleep(timeout / 4)
+            exercise(base_url, rounds)
+            return [process_memory(pid) for pid in worker_pids(server.pid)]
+        except (RuntimeError, TimeoutError):
+            sys.stderr.write(log_path.read_text())
+            raise
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def summarize(label: str, workers: List[Dict]) -> Dict[str, float]:
+    """Helper method to print per-worker memory and return the totals in MB."""
+    print(f"\n{label}")
+    print(
+        f"{'worker':>6} {'RSS MB':>8} {'PSS MB':>8}"
+        f" {'shared MB':>10} {'private MB':>11}"
+    )
+    totals = {"rss": 0.0, "pss": 0.0, "shared": 0.0, "private": 0.0}
+    for i, memory in enumerate(workers):
+        row = {
+            "rss": memory["Rss"] / 1024,
+            "pss": memory["Pss"] / 1024,
+            "shared": (memory["Shared_Clean"] + memory["Shared_Dirty"]) / 1024,
+            "private": (memory["Private_Clean"] + memory["Private_Dirty"]) / 1024,
+        }
+        totals = {key: totals[key] + row[key] for key in totals}
+        print(
+            f"{i:>6} {row['rss']:>8.1f} {row['pss']:>8.1f}"
+            f" {row['shared']:>10.1f} {row['private']:>11.1f}"
+        )
+    print(
+        f"{'total':>6} {totals['rss']:>8.1f} {totals['pss']:>8.1f}"
+        f" {totals['shared']:>10.1f} {totals['private']:>11.1f}"
+    )
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--min-shared", type=float, default=0.5)
+    parser.add_argument(
+        "--no-compare", action="store_true", help="skip the run without preload"
+    )
+    args = parser.parse_args()
+    os.environ.setdefault("REFRESH_INTERVAL", "0")
+
+    preloaded = summarize(
+        "preload (gunicorn.conf.py)",
+        measure(True, args.workers, args.rounds, args.timeout),
+    )
+    if not args.no_compare:
+        separate = summarize(
+            "without preload",
+            measure(False, args.workers, args.rounds, args.timeout),
+        )
+        print(
+            f"\nPreloading saves {separate['pss'] - preloaded['pss']:.1f} MB"
+            f" of proportional memory across {args.workers} workers"
+        )
+
+    shared_fraction = preloaded["shared"] / preloaded["rss"]
+    print(f"Preloaded workers keep {shared_fraction:.0%} of their memory shared")
+    sys.exit(0 if shared_fraction >= args.min_shared else 1)
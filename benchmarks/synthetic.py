@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic enrollment tables for benchmarking the dashboard pipeline."""
+
+# Import required libraries
+from typing import Dict, List
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+# Course numbers of the real catalog, used first so course-specific code still works
+CATALOG = [
+    "1010", "1100", "1150", "1800", "1801", "1810", "1811", "2100", "2150", "2710",
+    "2711", "3000", "3010", "3100", "3110", "3120", "3130", "3190", "3200", "3610",
+    "3980", "4100", "4110", "4300", "4310", "4320", "4350", "4370", "4460", "4490",
+    "4700", "4710", "4950", "4960",
+]  # fmt: skip
+
+
+def course_codes(n_courses: int) -> List[str]:
+    """Return n_courses course codes, the real catalog first, then made up ones.
+
+    Args:
+        n_courses (int): number of courses
+
+    Returns:
+        List[str]: course codes like "CHE1800"
+    """
+
+    extra = [f"{5000 + i:04d}" for i in range(max(0, n_courses - len(CATALOG)))]
+    return [f"CHE{number}" for number in (CATALOG + extra)[:n_courses]]
+
+
+def synthetic_tables(
+    n_courses: int = 34, n_dates: int = 30, seed: int = 0
+) -> Dict[str, pd.DataFrame]:
+    """Create Course x Date tables shaped like the output of process.py.
+
+    Args:
+        n_courses (int): number of courses (rows)
+        n_dates (int): number of snapshots (columns), at least 15
+        seed (int): random seed
+
+    Returns:
+        Dict[str, pd.DataFrame]: tester, tester3, older, max_old and test_vs_old.
+    """
+
+    rng = np.random.default_rng(seed)
+    courses = pd.Index(course_codes(n_courses), name="Course")
+    start = date(2021, 2, 1)
+    dates = [start + timedelta(days=day) for day in range(n_dates)][::-1]
+    old_dates = [day - timedelta(days=364) for day in dates]
+
+    capacity = rng.integers(20, 300, size=(n_courses, 1))
+    fill = np.sort(rng.uniform(0.05, 1.05, size=(n_courses, n_dates)), axis=1)[:, ::-1]
+    tester = pd.DataFrame(
+        np.rint(capacity * fill).astype(int), index=courses, columns=dates
+    )
+    older = pd.DataFrame(
+        np.rint(capacity * fill * rng.uniform(0.8, 1.2)).astype(int),
+        index=courses,
+        columns=old_dates,
+    )
+
+    return {
+        "tester": tester,
+        "tester3": tester / capacity,
+        "older": older,
+        "max_old": older / capacity,
+        "test_vs_old": tester / older.iloc[:, :1].to_numpy(),
+    }
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic processed SWRCGSR workbooks, laid out like the real count/ folder.
+
+Run from the repository root to write a term of workbooks:
+
+    python -m benchmarks.workbooks /tmp/swrcgsr --courses 300 --snapshots 30
+"""
+
+# Import required libraries
+from typing import List, Tuple
+from datetime import date, timedelta
+from pathlib import Path
+import argparse
+import numpy as np
+import pandas as pd
+
+# Module imports
+import process
+from benchmarks.synthetic import course_codes
+
+# The 25 columns of a processed SWRCGSR report, in workbook order
+COLUMNS = [
+    "Subj", "Nmbr", "CRN", "Sec", "S", "Cam", "Course", "Title", "Credit", "Max",
+    "Enrolled", "WCap", "WList", "Days", "Time", "Loc", "Rcap", "Full",
+    "Begin/End", "Instructor", "Begin", "End", "Ratio", "Bldg", "Notes",
+]  # fmt: skip
+
+# Section capacities typical of lectures, labs and seminars
+SECTION_SIZES = [12, 16, 20, 24, 48, 96, 144]
+
+
+def make_sections(
+    n_courses: int, max_sections: int, seed: int
+) -> List[Tuple[str, int, str, int]]:
+    """Lay out the sections offered in a term.
+
+    Args:
+        n_courses (int): number of courses
+        max_sections (int): each course has 1 to max_sections sections
+        seed (int): random seed
+
+    Returns:
+        List[Tuple[str, int, str, int]]: course, CRN, section number and capacity.
+    """
+
+    rng = np.random.default_rng(seed)
+    sections = []
+    crn = 30000
+    for course in course_codes(n_courses):
+        for number in range(int(rng.integers(1, max_sections + 1))):
+            crn += 1
+            sections.append(
+                (course, crn, f"{number + 1:03d}", int(rng.choice(SECTION_SIZES)))
+            )
+    return sections
+
+
+def write_term_workbooks(
+    directory: Path,
+    term: str,
+    start: date,
+    n_courses: int = 34,
+    max_sections: int = 3,
+    n_snapshots: int = 16,
+    seed: int = 0,
+) -> List[Path]:
+    """Write one workbook per daily snapshot of a term's enrollment.
+
+    Enrollment in every section grows towards its capacity over the snapshots,
+    with some waitlisting and the odd cancelled section.
+
+    Args:
+        directory (Path): folder for the workbooks, e.g. a count/ folder
+        term (str): term name, e.g. "Summer2021"
+        start (date): date of the first snapshot
+        n_courses (int): number of courses, at least the 34 of the real catalog
+        max_sections (int): each course has 1 to max_sections sections
+        n_snapshots (int): number of daily snapshots
+        seed (int): random seed
+
+    Returns:
+        List[Path]: the workbooks written, oldest first.
+    """
+
+    rng = np.random.default_rng(seed)
+    sections = make_sections(n_courses, max_sections, seed)
+    n_sections = len(sections)
+    courses = [course for course, _, _, _ in sections]
+    capacity = np.array([size for _, _, _, size in sections])
+    cancelled = rng.random(n_sections) < 0.02
+    demand = rng.uniform(0.3, 1.2, n_sections)
+
+    static = pd.DataFrame(
+        {
+            "Subj": "CHE",
+            "Nmbr": [course[3:] for course in courses],
+            "CRN": [crn for _, crn, _, _ in sections],
+            "Sec": [number for _, _, number, _ in sections],
+            "S": np.where(cancelled, "C", "A"),
+            "Cam": "M",
+            "Course": courses,
+            "Title": [f"Chemistry {course[3:]}" for course in courses],
+            "Credit": rng.choice([1, 3, 4], n_sections),
+            "Max": capacity,
+        }
+    )
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for day in range(n_snapshots):
+        progress = (day + 1) / n_snapshots
+        wanted = capacity * demand * progress * rng.uniform(0.95, 1.05, n_sections)
+        enrolled = np.where(
+            cancelled, 0, np.minimum(capacity, np.rint(wanted)).astype(int)
+        )
+        waitlist = np.where(enrolled >= capacity, rng.integers(0, 6, n_sections), 0)
+        ratio = np.round(enrolled / capacity * 100, 1)
+
+        frame = static.assign(
+            Enrolled=enrolled,
+            WCap=10,
+            WList=waitlist,
+            Days="MWF",
+            Time="1000-1050",
+            Loc="SI 2010",
+            Rcap=capacity,
+            Full=ratio,
+            **{"Begin/End": "01/19-05/15"},
+            Instructor="Staff",
+            Begin="01/19",
+            End="05/15",
+            Ratio=ratio,
+            Bldg="SI",
+            Notes="",
+        )[COLUMNS]
+
+        path = directory / f"{term}_{start + timedelta(days=day):%Y%m%d}.xlsx"
+        frame.to_excel(path, index=False)
+        paths.append(path)
+
+    return paths
+
+
+def write_dataset(
+    root: Path, n_courses: int, max_sections: int, n_snapshots: int, seed: int = 0
+) -> List[Path]:
+    """Write current and previous term workbooks into root/count.
+
+    The current term starts at process.MAX_DATE and the previous term a year
+    earlier, so the processing code finds every snapshot it expects.
+
+    Args:
+        root (Path): folder to run process.py from
+        n_courses (int): number of courses
+        max_sections (int): each course has 1 to max_sections sections
+        n_snapshots (int): number of daily snapshots per term
+        seed (int): random seed
+
+    Returns:
+        List[Path]: every workbook written.
+    """
+
+    count = Path(root) / "count"
+    current = write_term_workbooks(
+        count,
+        process.CURRENT_TERM,
+        process.MAX_DATE,
+        n_courses,
+        max_sections,
+        n_snapshots,
+        seed,
+    )
+    previous = write_term_workbooks(
+        count,
+        process.PREVIOUS_TERM,
+        process.MAX_DATE - timedelta(days=364),
+        n_courses,
+        max_sections,
+        n_snapshots,
+        seed + 1,
+    )
+    return current + previous
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", type=Path, help="folder to create count/ in")
+    parser.add_argument("--courses", type=int, default=34)
+    parser.add_argument("--sections", type=int, default=3)
+    parser.add_argument("--snapshots", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_dataset(
+        args.root, args.courses, args.sections, args.snapshots, args.seed
+    )
+    print(f"Wrote {len(paths)} workbooks to {args.root / 'count'}")
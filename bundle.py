@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar serving bundle for Plotly Dash webapp to process SWRCGSR Enrollment Reports.
+
+A bundle is a directory with one Arrow IPC file per table, one NumPy .npy file
+per array, one JSON file per serialized document (e.g. a figure) and a
+manifest.json describing them. Tables and arrays are memory-mapped, and every
+value is only loaded when first used.
+
+Each version of a term's bundle has its own folder, bundle/<term>/<version>,
+and terms.json in the root lists the terms, their current bundle versions and
+the current term. Files of a version never change once written, so a reader
+that loads values lazily always sees a single version.
+"""
+
+# Import required libraries
+from typing import Any, Dict, Iterator, List, Mapping
+from pathlib import Path
+from datetime import date, datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MANIFEST = "manifest.json"
+TERM_INDEX = "terms.json"
+
+# Seconds a superseded bundle version is kept, so readers that have not moved
+# to the new version yet can still load their files
+STALE_SECONDS = 3600
+
+
+def _encode_label(label: Any) -> str:
+    """Helper method to turn a date key or column label into a string."""
+    return label.isoformat() if isinstance(label, date) else str(label)
+
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """Helper method to make mixed-type object columns storable as Arrow strings."""
+    mixed = [
+        column
+        for column in df.columns
+        if df[column].dtype == object
+        and pd.api.types.infer_dtype(df[column], skipna=True).startswith("mixed")
+    ]
+    if not mixed:
+        return df
+    df = df.copy()
+    for column in mixed:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def write_frame(df: pd.DataFrame, path: Path) -> Dict[str, Any]:
+    """Write a dataframe as an uncompressed Arrow IPC file.
+
+    Args:
+        df (pd.DataFrame): dataframe to write
+        path (Path): file to write to
+
+    Returns:
+        Dict[str, Any]: manifest entry needed to read the frame back.
+    """
+
+    date_columns = len(df.columns) > 0 and all(
+        isinstance(column, date) for column in df.columns
+    )
+    out_df = _arrow_safe(df).set_axis(
+        [_encode_label(column) for column in df.columns], axis=1
+    )
+
+    # Write beside the target and rename, so readers that memory-mapped the old
+    # file keep a consistent copy.
+    table = pa.Table.from_pandas(out_df, preserve_index=True)
+    temp_path = path.with_suffix(".tmp")
+    with pa.OSFile(str(temp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+    return {
+        "kind": "frame",
+        "file": path.name,
+        "rows": len(df),
+        "date_columns": date_columns,
+        "columns_name": df.columns.name,
+    }
+
+
+def read_frame(path: Path, entry: Dict[str, Any]) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file and convert it back to a dataframe.
+
+    Args:
+        path (Path): file to read
+        entry (Dict[str, Any]): manifest entry written by write_frame
+
+    Returns:
+        pd.DataFrame
+    """
+
+    source = pa.memory_map(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    df = table.to_pandas(split_blocks=True)
+
+    if entry["date_columns"]:
+        df.columns = [date.fromisoformat(column) for column in df.columns]
+    df.columns.name = entry["columns_name"]
+    return df
+
+
+def frame_to_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a dataframe as an Arrow IPC stream, e.g. to store in a database.
+
+    Args:
+        df (pd.DataFrame): dataframe with string column labels
+
+    Returns:
+        bytes: the stream, readable with frame_from_bytes.
+    """
+
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_bytes(data: bytes) -> pd.DataFrame:
+    """Read back a dataframe serialized by frame_to_bytes."""
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def write_array(array: np.ndarray, path: Path) -> Dict[str, Any]:
+    """Write a NumPy array as an .npy file.
+
+    Args:
+        array (np.ndarray): array to write
+        path (Path): file to write to
+
+    Returns:
+        Dict[str, Any]: manifest entry needed to read the array back.
+    """
+
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "wb") as out_file:
+        np.save(out_file, array, allow_pickle=False)
+    os.replace(temp_path, path)
+    return {"kind": "array", "file": path.name, "shape": list(array.shape)}
+
+
+def read_array(path: Path) -> np.ndarray:
+    """Memory-map an .npy file written by write_array, read-only."""
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+def write_json(text: str, path: Path) -> Dict[str, Any]:
+    """Write an already serialized JSON document, e.g. a Plotly figure.
+
+    Args:
+        text (str): JSON document
+        path (Path): file to write to
+
+    Returns:
+        Dict[str, Any]: manifest entry needed to read the document back.
+    """
+
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(text)
+    os.replace(temp_path, path)
+    return {"kind": "json", "file": path.name}
+
+
+def read_json(path: Path) -> Any:
+    """Read a JSON document written by write_json."""
+    with open(path) as in_file:
+        return json.load(in_file)
+
+
+def write_bundle(data: Dict[str, Any], directory: str) -> Dict[str, Any]:
+    """Write a dictionary of dataframes, arrays and JSON documents.
+
+    Args:
+        data (Dict[str, Any]): values are pd.DataFrame, np.ndarray or str
+                               (serialized JSON)
+        directory (str): bundle directory to write
+
+    Returns:
+        Dict[str, Any]: the bundle manifest.
+    """
+
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+
+    entries: Dict[str, Any] = {}
+    for key, value in data.items():
+        if isinstance(value, pd.DataFrame):
+            entries[key] = write_frame(value, root / f"{key}.arrow")
+        elif isinstance(value, np.ndarray):
+            entries[key] = write_array(value, root / f"{key}.npy")
+        elif isinstance(value, str):
+            entries[key] = write_json(value, root / f"{key}.json")
+        else:
+            raise TypeError(f"Cannot write {key} of type {type(value).__name__}")
+
+    manifest = {
+        "version": _bundle_version(root, bundle_files({"entries": entries})),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "entries": entries,
+    }
+    with open(root / f"{MANIFEST}.tmp", "w") as out_file:
+        json.dump(manifest, out_file, indent=1)
+    os.replace(root / f"{MANIFEST}.tmp", root / MANIFEST)
+
+    return manifest
+
+
+def write_versioned_bundle(data: Dict[str, Any], directory: str) -> Dict[str, Any]:
+    """Write a bundle into its own version folder of directory.
+
+    The bundle is written to a staging folder, then renamed to directory/<version>;
+    a version that is already there is left as it is.
+
+    Args:
+        data (Dict[str, Any]): values as for write_bundle
+        directory (str): folder of the term's bundle versions
+
+    Returns:
+        Dict[str, Any]: the bundle manifest.
+    """
+
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=root, prefix=".staging-"))
+    manifest = write_bundle(data, str(staging))
+
+    target = root / manifest["version"]
+    if target.is_dir():
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, target)
+    return manifest
+
+
+def remove_stale_versions(
+    directory: str, keep: str, grace: float = STALE_SECONDS
+) -> List[str]:
+    """Delete bundle versions that were superseded more than grace seconds ago.
+
+    A version counts as superseded when the manifest of the next newer version
+    was written; the kept version is never deleted.
+
+    Args:
+        directory (str): folder of the term's bundle versions
+        keep (str): version in use
+        grace (float): seconds a superseded version is kept
+
+    Returns:
+        List[str]: versions deleted.
+    """
+
+    root = Path(directory)
+    if not root.is_dir():
+        return []
+    versions = sorted(
+        (path for path in root.iterdir() if (path / MANIFEST).is_file()),
+        key=lambda path: (path / MANIFEST).stat().st_mtime,
+    )
+
+    removed = []
+    now = time.time()
+    for older, newer in zip(versions, versions[1:]):
+        if older.name != keep and now - (newer / MANIFEST).stat().st_mtime > grace:
+            shutil.rmtree(older, ignore_errors=True)
+            removed.append(older.name)
+    return removed
+
+
+def bundle_files(manifest: Dict[str, Any]) -> List[str]:
+    """List the data files referenced by a bundle manifest."""
+    return [entry["file"] for entry in manifest["entries"].values()]
+
+
+def _bundle_version(root: Path, files: List[str]) -> str:
+    """Helper method to derive a bundle version from the content of its files."""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode())
+        digest.update((root / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class Bundle(Mapping):
+    """Read-only view of a bundle directory that loads each key on first access."""
+
+    def __init__(self, directory: str) -> None:
+        self.root = Path(directory)
+        with open(self.root / MANIFEST) as in_file:
+            self.manifest = json.load(in_file)
+        self.version = self.manifest["version"]
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the bundle files on disk, about what they take once loaded."""
+        return sum(
+            (self.root / name).stat().st_size for name in bundle_files(self.manifest)
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            entry = self.manifest["entries"][key]
+            if entry["kind"] == "json":
+                self._values[key] = read_json(self.root / entry["file"])
+            elif entry["kind"] == "array":
+                self._values[key] = read_array(self.root / entry["file"])
+            else:
+                self._values[key] = read_frame(self.root / entry["file"], entry)
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["entries"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["entries"])
+
+
+def read_bundle(directory: str) -> Bundle:
+    """Open a bundle directory for lazy, memory-mapped reads.
+
+    Args:
+        directory (str): bundle directory written by write_bundle
+
+    Returns:
+        Bundle: mapping of bundle keys to dataframes, arrays and JSON documents.
+    """
+
+    return Bundle(directory)
+
+
+def write_term_index(
+    directory: str, versions: Dict[str, str], current: str
+) -> Dict[str, Any]:
+    """Write the index of the term bundles under a bundle root.
+
+    Args:
+        directory (str): bundle root, with one bundle folder per term
+        versions (Dict[str, str]): bundle version of each term
+        current (str): term shown by default
+
+    Returns:
+        Dict[str, Any]: the index.
+    """
+
+    index = {"current": current, "terms": versions}
+    root = Path(directory)
+    with open(root / f"{TERM_INDEX}.tmp", "w") as out_file:
+        json.dump(index, out_file, indent=1)
+    os.replace(root / f"{TERM_INDEX}.tmp", root / TERM_INDEX)
+    return index
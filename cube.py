@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""Enrollment cube aligned on days from the start of each term.
+
+The cube is a float32 array of course x day offset x term. Offsets count days
+from the term's first day of classes (negative before it), and term 0 is the
+bundle's own term followed by the same season of earlier years. Comparing a
+term with any number of prior years at the same point in registration is a
+slice, e.g. percent_of_prior(cube, axes, days_before=60, years=3).
+"""
+
+# Import required libraries
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date
+import re
+import numpy as np
+import pandas as pd
+
+# Approximate first day of classes of each season, as (month, day)
+SEASON_STARTS = {"Spring": (1, 20), "Summer": (6, 1), "Fall": (8, 20)}
+
+# Day offsets from the term start covered by the cube
+FIRST_OFFSET = -180
+LAST_OFFSET = 30
+
+# Days a prior term's last snapshot is carried forward, so snapshots taken a
+# day or two apart in different years still line up
+CARRY_DAYS = 7
+
+
+def split_term(term: str) -> Tuple[str, int]:
+    """Helper method to split a term like "Summer2021" into season and year."""
+    match = re.fullmatch(r"([A-Za-z]+)(\d{4})", term)
+    if match is None:
+        raise ValueError(f"Term {term!r} is not a season followed by a year")
+    return match.group(1), int(match.group(2))
+
+
+def term_start(term: str, starts: Optional[Dict[str, date]] = None) -> date:
+    """Return the first day of classes of a term.
+
+    Args:
+        term (str): term, e.g. "Summer2021"
+        starts (Optional[Dict[str, datetime.date]]): known start dates, used
+            before the SEASON_STARTS estimate
+
+    Returns:
+        datetime.date
+    """
+
+    if starts and term in starts:
+        return starts[term]
+    season, year = split_term(term)
+    return date(year, *SEASON_STARTS[season])
+
+
+def prior_terms(term: str, years: int) -> List[str]:
+    """List the same season of each of the previous years, most recent first."""
+    season, year = split_term(term)
+    return [f"{season}{year - offset}" for offset in range(1, years + 1)]
+
+
+def term_slice(
+    fact: pd.DataFrame,
+    courses: List[str],
+    start: date,
+    renames: Dict[str, str],
+    carry_days: int = 0,
+) -> np.ndarray:
+    """Total one term's enrollment per course at every day offset of the cube.
+
+    Days between snapshots carry the previous snapshot forward. Days before
+    the first snapshot or more than carry_days after the last, and courses
+    the term does not have, are NaN.
+
+    Args:
+        fact (pd.DataFrame): fact table of the term, see archive.fact_table
+        courses (List[str]): course axis of the cube
+        start (datetime.date): first day of classes of the term
+        renames (Dict[str, str]): old course numbers to their cube course
+        carry_days (int): days the last snapshot is carried forward
+
+    Returns:
+        np.ndarray: float32 array of course x day offset.
+    """
+
+    n_offsets = LAST_OFFSET - FIRST_OFFSET + 1
+    values = np.full((len(courses), n_offsets), np.nan, dtype=np.float32)
+
+    offsets = (pd.to_datetime(fact["Date"]) - pd.Timestamp(start)).dt.days
+    in_range = fact[offsets.between(FIRST_OFFSET, LAST_OFFSET).to_numpy()]
+    if in_range.empty:
+        return values
+
+    totals = (
+        in_range.assign(Course=in_range["Course"].replace(renames))
+        .groupby(["Course", "Date"])["Enrolled"]
+        .sum()
+        .unstack("Date")
+        .reindex(courses)
+    )
+    # A course missing from one snapshot of its term had no enrollment that day
+    offered = totals.notna().any(axis=1).to_numpy()
+    totals = totals.fillna(0)
+    totals.loc[~offered] = np.nan
+
+    columns = np.array([(day - start).days for day in totals.columns]) - FIRST_OFFSET
+    observed = np.zeros(n_offsets, dtype=bool)
+    observed[columns] = True
+    values[:, columns] = totals.to_numpy(dtype=np.float32)
+
+    # Index of the latest snapshot on or before each day
+    latest = np.maximum.accumulate(np.where(observed, np.arange(n_offsets), 0))
+    filled = values[:, latest]
+    filled[:, : columns.min()] = np.nan
+    filled[:, columns.max() + carry_days + 1 :] = np.nan
+    return filled
+
+
+def build_cube(
+    facts: Dict[str, pd.DataFrame],
+    starts: Dict[str, date],
+    renames: Optional[Dict[str, str]] = None,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Build the enrollment cube of a term and its prior terms.
+
+    Args:
+        facts (Dict[str, pd.DataFrame]): fact table of each term, the bundle's
+            term first and then its prior terms, most recent first
+        starts (Dict[str, datetime.date]): first day of classes of each term
+        renames (Optional[Dict[str, str]]): old course numbers renumbered in
+            the first term's catalog
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Any]]: float32 cube of course x day offset
+            x term, and its axes: courses, terms, term starts and offsets.
+    """
+
+    terms = list(facts)
+    courses = sorted(facts[terms[0]]["Course"].unique())
+    cube = np.stack(
+        [
+            term_slice(
+                facts[term],
+                courses,
+                starts[term],
+                renames or {},
+                carry_days=CARRY_DAYS if i > 0 else 0,
+            )
+            for i, term in enumerate(terms)
+        ],
+        axis=2,
+    )
+    axes = {
+        "courses": courses,
+        "terms": terms,
+        "starts": {term: starts[term].isoformat() for term in terms},
+        "offsets": [FIRST_OFFSET, LAST_OFFSET],
+    }
+    return cube, axes
+
+
+def offset_index(axes: Dict[str, Any], days_before: int) -> int:
+    """Helper method to find the cube index of a number of days before the start."""
+    first, last = axes["offsets"]
+    if not first <= -days_before <= last:
+        raise IndexError(f"{days_before} days before the start is outside the cube")
+    return -days_before - first
+
+
+def latest_days_before(cube: np.ndarray, axes: Dict[str, Any]) -> int:
+    """Return how many days before its start the first term's last snapshot was."""
+    has_data = np.flatnonzero(~np.isnan(cube[:, :, 0]).all(axis=0))
+    if has_data.size == 0:
+        raise ValueError(f"{axes['terms'][0]} has no snapshots in the cube")
+    return -(axes["offsets"][0] + int(has_data[-1]))
+
+
+def percent_of_prior(
+    cube: np.ndarray, axes: Dict[str, Any], days_before: int, years: int
+) -> pd.Series:
+    """Compare each course with the mean of up to years prior terms on the same day.
+
+    Args:
+        cube (np.ndarray): cube from build_cube
+        axes (Dict[str, Any]): axes from build_cube
+        days_before (int): days before the term start
+        years (int): number of prior terms to average
+
+    Returns:
+        pd.Series: fraction of the prior mean, indexed by course; NaN where no
+            prior term has the course.
+    """
+
+    day = cube[:, offset_index(axes, days_before), :]
+    prior = day[:, 1 : years + 1]
+    counts = (~np.isnan(prior)).sum(axis=1)
+    mean = np.where(counts > 0, np.nansum(prior, axis=1) / np.maximum(counts, 1), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(mean > 0, day[:, 0] / mean, np.nan)
+    return pd.Series(ratio, index=pd.Index(axes["courses"], name="Course"))
+
+
+def term_totals(cube: np.ndarray, axes: Dict[str, Any]) -> pd.DataFrame:
+    """Total the cube over courses, NaN where a term has no data.
+
+    Args:
+        cube (np.ndarray): cube from build_cube
+        axes (Dict[str, Any]): axes from build_cube
+
+    Returns:
+        pd.DataFrame: day offset x term enrollment.
+    """
+
+    has_data = ~np.isnan(cube).all(axis=0)
+    totals = np.where(has_data, np.nansum(cube, axis=0), np.nan)
+    first, last = axes["offsets"]
+    return pd.DataFrame(
+        totals,
+        index=pd.RangeIndex(first, last + 1, name="Offset"),
+        columns=axes["terms"],
+    )
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""Server-side paging, sorting and filtering for the Latest Data table.
+
+Queries use the DataTable filter syntax, e.g. "{Course} contains 1800 && {Max} > 20".
+"""
+
+# Import required libraries
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# DataTable filter operators, with the longer spellings first
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+# Number of fill buckets drawn as data bars in the Max column; each bar is drawn
+# at its bucket's midpoint, so it is within 100 / FILL_BUCKETS / 2 points
+FILL_BUCKETS = 10
+
+
+def highlight_flags(df: pd.DataFrame) -> pd.DataFrame:
+    """Precompute the highlight classes of every row of a snapshot.
+
+    Adds EnrollClass ("low", "near-full", "full" or ""), Waitlisted and
+    Cancelled (0/1) and FillBucket (0 to FILL_BUCKETS - 1 from Ratio, -1 if
+    unknown), so the table only needs a handful of style rules.
+
+    Args:
+        df (pd.DataFrame): snapshot with Enrolled, Max, WList, S and Ratio columns
+
+    Returns:
+        pd.DataFrame: a copy of df with the flag columns added.
+    """
+
+    active = df["S"].astype(str).str.contains("A", regex=False)
+    low = active & (((df["Enrolled"] < 10) & (df["Max"] >= 20)) | (df["Enrolled"] < 6))
+    ratio = df["Ratio"]
+
+    buckets = np.floor(ratio.to_numpy(dtype=float) * FILL_BUCKETS / 100)
+    buckets = np.clip(np.nan_to_num(buckets, nan=-1), -1, FILL_BUCKETS - 1)
+
+    return df.assign(
+        EnrollClass=np.select(
+            [ratio > 94, ratio > 80, low], ["full", "near-full", "low"], ""
+        ),
+        Waitlisted=(df["WList"] > 0).astype(int),
+        Cancelled=df["S"].astype(str).str.contains("C", regex=False).astype(int),
+        FillBucket=buckets.astype(int),
+    )
+
+
+def split_filter_part(filter_part: str) -> Tuple[Optional[str], Optional[str], str]:
+    """Split one clause of a DataTable filter query.
+
+    Args:
+        filter_part (str): a clause like "{Enrolled} > 10"
+
+    Returns:
+        Tuple[Optional[str], Optional[str], str]: column, operator and unquoted
+            value, or (None, None, "") if the clause is not understood.
+    """
+
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1 : name_part.rfind("}")]
+
+                value_part = value_part.strip()
+                v0 = value_part[0:1]
+                if len(value_part) > 1 and v0 == value_part[-1] and v0 in "'\"`":
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                else:
+                    value = value_part
+
+                # word operators need spaces after them in the filter string,
+                # but we don't want these later
+                return name, operator_type[0].strip(), value
+
+    return None, None, ""
+
+
+def filter_mask(df: pd.DataFrame, filter_query: Optional[str]) -> np.ndarray:
+    """Evaluate a DataTable filter query into a boolean row mask.
+
+    Clauses on unknown columns, or that cannot be understood, are ignored.
+
+    Args:
+        df (pd.DataFrame): table to filter
+        filter_query (Optional[str]): clauses joined by " && "
+
+    Returns:
+        np.ndarray: True for rows that match every clause.
+    """
+
+    mask = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return mask
+
+    for filter_part in filter_query.split(" && "):
+        name, operator, value = split_filter_part(filter_part)
+        if name not in df.columns:
+            continue
+        column = df[name]
+
+        if operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+            if pd.api.types.is_numeric_dtype(column):
+                try:
+                    operand: Any = float(value)
+                except ValueError:
+                    continue
+            else:
+                column, operand = column.astype(str), value
+            part = getattr(column, operator)(operand).to_numpy()
+        elif operator == "contains":
+            part = column.astype(str).str.contains(value, regex=False).to_numpy()
+        elif operator == "datestartswith":
+            part = column.astype(str).str.startswith(value).to_numpy()
+        else:
+            continue
+        mask &= np.asarray(part, dtype=bool)
+
+    return mask
+
+
+class TableIndex:
+    """In-memory table with a precomputed row order for every sortable column."""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df.reset_index(drop=True)
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+        for column in self.df.columns:
+            for ascending in (True, False):
+                self._orders[(column, ascending)] = (
+                    self.df[column]
+                    .sort_values(
+                        ascending=ascending, kind="mergesort", na_position="last"
+                    )
+                    .index.to_numpy()
+                )
+
+    def row_order(self, sort_by: Optional[List[Dict[str, str]]]) -> np.ndarray:
+        """Return row positions sorted as requested by the DataTable sort_by.
+
+        Args:
+            sort_by (Optional[List[Dict[str, str]]]): column_id/direction pairs
+
+        Returns:
+            np.ndarray: row positions in sorted order.
+        """
+
+        sort_by = [col for col in sort_by or [] if col["column_id"] in self.df.columns]
+        if not sort_by:
+            return np.arange(len(self.df))
+        if len(sort_by) == 1:
+            return self._orders[
+                (sort_by[0]["column_id"], sort_by[0]["direction"] == "asc")
+            ]
+
+        return self.df.sort_values(
+            [col["column_id"] for col in sort_by],
+            ascending=[col["direction"] == "asc" for col in sort_by],
+            kind="mergesort",
+            na_position="last",
+        ).index.to_numpy()
+
+    def query(
+        self,
+        page_current: int,
+        page_size: int,
+        sort_by: Optional[List[Dict[str, str]]] = None,
+        filter_query: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Answer a DataTable page request.
+
+        Args:
+            page_current (int): zero-based page number
+            page_size (int): rows per page
+            sort_by (Optional[List[Dict[str, str]]]): DataTable sort_by
+            filter_query (Optional[str]): DataTable filter_query
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: the page's records and the page count.
+        """
+
+        order = self.row_order(sort_by)
+        mask = filter_mask(self.df, filter_query)
+        rows = order[mask[order]]
+
+        page_count = max(1, -(-len(rows) // page_size))
+        start = page_current * page_size
+        page = self.df.iloc[rows[start : start + page_size]]
+
+        return page.to_dict("records"), page_count
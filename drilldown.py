@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""Course drilldown graph for Plotly Dash webapp to process SWRCGSR Enrollment Reports.
+
+The graph is built when a course is clicked, so it only uses
+plotly.graph_objects; the app does not import plotdata and plotly.express.
+"""
+
+# Import required libraries
+from typing import Any, Dict, List
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+import plotly.subplots
+
+# Module imports
+import metrics
+
+
+@metrics.timed()
+def generate_section_graph(
+    course: str, crns: List[int], dates: List[Any], series: Dict[str, np.ndarray]
+) -> Any:
+    """Plot the enrollment, capacity and waitlist of each section of a course.
+
+    Args:
+        course (str): course, e.g. "CHE1800"
+        crns (List[int]): CRN of each section
+        dates (List[datetime.date]): snapshot dates
+        series (Dict[str, np.ndarray]): section x date arrays of Enrolled, Max
+                                        and WList, see sections.SectionIndex
+
+    Returns:
+        Any: plotly graph object
+    """
+
+    fig_sections = plotly.subplots.make_subplots(
+        rows=2, cols=1, shared_xaxes=True, row_heights=[0.75, 0.25]
+    )
+    colors = plotly.colors.qualitative.Plotly
+    for i, crn in enumerate(crns):
+        color = colors[i % len(colors)]
+        fig_sections.add_trace(
+            go.Scatter(
+                x=dates,
+                y=series["Enrolled"][i],
+                name=str(crn),
+                legendgroup=str(crn),
+                line=dict(color=color),
+            ),
+            row=1,
+            col=1,
+        )
+        fig_sections.add_trace(
+            go.Scatter(
+                x=dates,
+                y=series["Max"][i],
+                name=f"{crn} Max",
+                legendgroup=str(crn),
+                showlegend=False,
+                line=dict(color=color, dash="dot"),
+            ),
+            row=1,
+            col=1,
+        )
+        fig_sections.add_trace(
+            go.Bar(
+                x=dates,
+                y=series["WList"][i],
+                name=f"{crn} WList",
+                legendgroup=str(crn),
+                showlegend=False,
+                marker_color=color,
+            ),
+            row=2,
+            col=1,
+        )
+
+    fig_sections.update_layout(
+        template="ggplot2",
+        title=f"{course} sections: enrollment and max (dotted), waitlist below",
+        barmode="group",
+        legend_title_text="CRN",
+    )
+    fig_sections.update_yaxes(title_text="Students", row=1, col=1)
+    fig_sections.update_yaxes(title_text="Waitlist", row=2, col=1)
+
+    return fig_sections
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""End-of-registration enrollment forecasts from prior terms' registration curves.
+
+For every course, each prior term in the enrollment cube gives a growth
+ratio from the same number of days before its start to its last snapshot.
+The forecast applies the mean log growth to the current enrollment, and the
+interval its spread across years. All courses are fitted at once with array
+operations.
+"""
+
+# Import required libraries
+from typing import Any, Dict
+import numpy as np
+import pandas as pd
+
+# Module imports
+import cube
+
+# Normal quantile of the two-sided forecast interval (90%)
+INTERVAL_Z = 1.645
+
+# Added to enrollment before taking ratios, so empty courses have a growth rate
+SMOOTHING = 1.0
+
+
+def last_offsets(cube_data: np.ndarray) -> np.ndarray:
+    """Helper method to find the index of the last day with data of every term."""
+    has_data = ~np.isnan(cube_data).all(axis=0)
+    last = has_data.shape[0] - 1 - np.argmax(has_data[::-1], axis=0)
+    return np.where(has_data.any(axis=0), last, -1)
+
+
+def forecast_courses(
+    cube_data: np.ndarray, axes: Dict[str, Any], days_before: int
+) -> pd.DataFrame:
+    """Project every course's final enrollment from its prior terms.
+
+    Courses without prior data grow like the whole department. Courses with
+    a single prior term get the spread of growth across all courses as their
+    uncertainty.
+
+    Args:
+        cube_data (np.ndarray): enrollment cube from cube.build_cube
+        axes (Dict[str, Any]): axes from cube.build_cube
+        days_before (int): days before the start of the current enrollment
+
+    Returns:
+        pd.DataFrame: Enrolled, Forecast, Low, High and Years (prior terms
+                      used) columns, indexed by Course.
+    """
+
+    day = cube_data[:, cube.offset_index(axes, days_before), :].astype(np.float64)
+    now, prior_now = day[:, 0], day[:, 1:]
+
+    last = last_offsets(cube_data)[1:]
+    prior_final = cube_data[:, last, np.arange(1, cube_data.shape[2])].astype(
+        np.float64
+    )
+    # Prior terms with no data at all have no usable final enrollment
+    prior_final[:, last < 0] = np.nan
+
+    growth = np.log((prior_final + SMOOTHING) / (prior_now + SMOOTHING))
+    known = ~np.isnan(growth)
+    years = known.sum(axis=1)
+    growth = np.where(known, growth, 0)
+
+    # Whole department growth over the prior terms, for courses without history
+    department_final = np.where(known, prior_final, 0).sum()
+    department_now = np.where(known, prior_now, 0).sum()
+    department = np.log((department_final + SMOOTHING) / (department_now + SMOOTHING))
+
+    mean = np.where(years > 0, growth.sum(axis=1) / np.maximum(years, 1), department)
+    squares = np.where(known, (growth - mean[:, None]) ** 2, 0).sum(axis=1)
+    spread = np.sqrt(squares / np.maximum(years - 1, 1))
+    # Spread of course growth around the department's, for courses with one term
+    pooled = np.sqrt(
+        np.where(known, (growth - department) ** 2, 0).sum() / max(known.sum() - 1, 1)
+    )
+    spread = np.where(years > 1, spread, pooled)
+
+    base = now + SMOOTHING
+    forecast = pd.DataFrame(
+        {
+            "Enrolled": now,
+            "Forecast": base * np.exp(mean) - SMOOTHING,
+            "Low": base * np.exp(mean - INTERVAL_Z * spread) - SMOOTHING,
+            "High": base * np.exp(mean + INTERVAL_Z * spread) - SMOOTHING,
+            "Years": years,
+        },
+        index=pd.Index(axes["courses"], name="Course"),
+    )
+    forecast[["Forecast", "Low", "High"]] = forecast[["Forecast", "Low", "High"]].clip(
+        lower=0
+    )
+    return forecast[~np.isnan(now)]
+
+
+def forecast_sections(sections: pd.DataFrame, courses: pd.DataFrame) -> pd.DataFrame:
+    """Split each course forecast over its sections by their share of enrollment.
+
+    Args:
+        sections (pd.DataFrame): latest snapshot with CRN, Course, Enrolled
+                                 and Max columns
+        courses (pd.DataFrame): forecast from forecast_courses
+
+    Returns:
+        pd.DataFrame: the sections with Forecast, Low and High columns added;
+                      sections of courses without a forecast are dropped.
+    """
+
+    sections = sections[sections["Course"].isin(courses.index)]
+    sections = sections[["CRN", "Course", "Enrolled", "Max"]].reset_index(drop=True)
+
+    smoothed = sections["Enrolled"] + SMOOTHING
+    share = smoothed / smoothed.groupby(sections["Course"]).transform("sum")
+    course_values = courses.reindex(sections["Course"])
+    for column in ["Forecast", "Low", "High"]:
+        sections[column] = share.to_numpy() * course_values[column].to_numpy()
+    return sections
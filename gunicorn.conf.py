@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+"""Gunicorn configuration that loads the enrollment data once, before forking.
+
+The master imports app.py with LOAD_BUNDLE_ON_IMPORT set, so the bundle is
+fetched and every tab rendered a single time; the workers share those pages
+copy-on-write. Each worker starts its own refresher thread after the fork,
+which creates its own S3 client, so no client or thread crosses a fork.
+
+Workers and the port follow WEB_CONCURRENCY and PORT as usual.
+Check the sharing with benchmarks/check_shared_memory.py.
+"""
+
+# Import required libraries
+import gc
+
+preload_app = True
+raw_env = ["LOAD_BUNDLE_ON_IMPORT=1"]
+
+
+def pre_fork(server, worker):
+    """Freeze the loaded objects, so collections in workers leave them shared."""
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Start the worker's bundle refresher; threads do not survive the fork."""
+    import app
+
+    app.refresher = app.start_refresher()
@@ -4,19 +4,46 @@
 
 # Import required libraries
 import dash_html_components as html
+import dash_core_components as dcc
 import dash_bootstrap_components as dbc
-from typing import Any, Dict
+import dash_table
 
+# Module imports
+import datatable
+from typing import Any, List, Optional
 
-def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
-    """Create a dash bootstrap based website layout.
+# Dashboard tabs, in display order
+TAB_LABELS = [
+    "Heatmap",
+    "Over Time",
+    "Total",
+    "Percent Max",
+    "Percent Last Year",
+    "Prior Years",
+    "Forecast",
+    "Latest Data",
+]
+
+# Rows per page of the Latest Data table
+TABLE_PAGE_SIZE = 50
+
+
+def nav_brand(term: str) -> str:
+    """Helper method to title the navigation bar with a term."""
+    if not term:
+        return "CHE Enrollment Statistics"
+    return f"CHE Enrollment Statistics -- {term}"
+
+
+def generate_nav_bar(term: str, terms: Optional[List[str]] = None) -> Any:
+    """Create the top navigation bar.
 
     Args:
-        graph_dict (Dict[str, Any]: dictionary of plotly graph objects and dash tables.
         term (str): term to analyze, e.g. "Spring2021"
+        terms (List[str]): terms offered in the term menu, none for no menu
 
     Returns:
-        html.Div wrapping a website layout.
+        dbc.NavbarSimple
     """
 
     nav_text = dbc.NavItem(dbc.NavLink("Designed by", disabled=True, href="#"))
@@ -25,9 +52,22 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
         dbc.NavLink("Dr. Andrew J. Bonham", href="https://github.com/Paradoxdruid")
     )
 
-    nav_bar = dbc.NavbarSimple(
-        children=[nav_text, nav_item],
-        brand=f"CHE Enrollment Statistics -- {term}",
+    children = [nav_text, nav_item]
+    if terms:
+        # Menu items only change the URL query; callbacks follow the URL
+        term_menu = dbc.DropdownMenu(
+            [dbc.DropdownMenuItem(name, href=f"?term={name}") for name in terms],
+            label=term,
+            id="term-menu",
+            nav=True,
+            in_navbar=True,
+        )
+        children.insert(0, term_menu)
+
+    return dbc.NavbarSimple(
+        children=children,
+        id="nav-bar",
+        brand=nav_brand(term),
         # brand_href="#",
         brand_style={"font-weight": "bold"},
         sticky="top",
@@ -35,6 +75,61 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
         fluid=True,
     )
 
+
+def generate_placeholder_layout(term: str) -> Any:
+    """Create a lightweight layout to serve while the enrollment data loads.
+
+    The page polls /readyz and reloads itself once the dashboard is ready.
+
+    Args:
+        term (str): term to analyze, e.g. "Spring2021"
+
+    Returns:
+        html.Div wrapping a website layout.
+    """
+
+    return html.Div(
+        [
+            generate_nav_bar(term),
+            dbc.Container(
+                fluid=True,
+                children=[
+                    dbc.Row(
+                        dbc.Col(
+                            [
+                                dbc.Spinner(color="primary"),
+                                html.P("Loading enrollment data..."),
+                            ],
+                            className="m-5 text-center",
+                            width=12,
+                        ),
+                    ),
+                ],
+            ),
+            dcc.Interval(id="loading-interval", interval=5000),
+            html.Div(id="loading-status", hidden=True),
+        ],
+    )
+
+
+def generate_layout(terms: List[str], term: str) -> Any:
+    """Create a dash bootstrap based website layout.
+
+    Only the shell is sent with the layout. The term is chosen by the URL query
+    (?term=Spring2021); the content of the active tab is filled into
+    "tab-content", the term's data version into the footer and the sections
+    of a clicked course into "section-modal", by callbacks.
+
+    Args:
+        terms (List[str]): terms offered in the term menu
+        term (str): term shown when the URL names none, e.g. "Spring2021"
+
+    Returns:
+        html.Div wrapping a website layout.
+    """
+
+    nav_bar = generate_nav_bar(term, terms)
+
     bottom_bar = dbc.NavbarSimple(
         children=[
             dbc.NavLink(
@@ -43,6 +138,14 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
             ),
             dbc.NavLink("Bonham Code projects", href="https://bonhamcode.com"),
             dbc.NavLink("Dr. Bonham's Research Lab", href="https://www.bonhamlab.com"),
+            dbc.NavItem(
+                dbc.NavLink(
+                    "",
+                    id="data-version",
+                    disabled=True,
+                    href="#",
+                ),
+            ),
         ],
         brand="Other Projects:",
         sticky="bottom",
@@ -51,18 +154,25 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
     )
 
     all_tabs = dbc.Tabs(
+        [dbc.Tab(label=label, tab_id=label) for label in TAB_LABELS],
+        id="tabs",
+        active_tab=TAB_LABELS[0],
+    )
+
+    # Sections of a course clicked on any graph, filled in by a callback
+    section_modal = dbc.Modal(
         [
-            dbc.Tab(graph_dict["Heatmap"], label="Heatmap"),
-            dbc.Tab(graph_dict["Over Time"], label="Over Time"),
-            dbc.Tab(graph_dict["Total"], label="Total"),
-            dbc.Tab(graph_dict["Percent Max"], label="Percent Max"),
-            dbc.Tab(graph_dict["Percent Last Year"], label="Percent Last Year"),
-            dbc.Tab(graph_dict["Latest Data"], label="Latest Data"),
+            dbc.ModalHeader(id="section-title"),
+            dbc.ModalBody(dcc.Graph(id="section-graph", style={"height": "65vh"})),
         ],
+        id="section-modal",
+        size="xl",
+        is_open=False,
     )
 
     return html.Div(
         [
+            dcc.Location(id="url", refresh=False),
             nav_bar,
             dbc.Container(
                 fluid=True,
@@ -70,7 +180,7 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
                     dbc.Row(
                         dbc.Col(
                             html.Div(
-                                [all_tabs],
+                                [all_tabs, html.Div(id="tab-content")],
                                 className="m-3",
                             ),
                             width=12,
@@ -83,5 +193,196 @@ def generate_layout(graph_dict: Dict[str, Any], term: str) -> Any:
                 ],
             ),
             bottom_bar,
+            section_modal,
         ],
     )
+
+
+def data_bars(column_apply):
+    """Apply styling to dash table columns.
+
+    Args:
+        column_apply: id of column to apply styles to.
+
+    Returns:
+        styles: a list of styles for the dash table, one per FillBucket value
+    """
+
+    styles = []
+    for bucket in range(datatable.FILL_BUCKETS):
+        # Midpoint of the bucket, so a bar is never off by a whole bucket
+        max_bound_percentage = (bucket + 0.5) * 100 / datatable.FILL_BUCKETS
+        styles.append(
+            {
+                "if": {
+                    "filter_query": f"{{FillBucket}} = {bucket}",
+                    "column_id": column_apply,
+                },
+                "background": (
+                    """
+                    linear-gradient(90deg,
+                    #CACACA 0%,
+                    #CACACA {max_bound_percentage}%,
+                    white {max_bound_percentage}%,
+                    white 100%)
+                """.format(
+                        max_bound_percentage=max_bound_percentage
+                    )
+                ),
+                "paddingBottom": 2,
+                "paddingTop": 2,
+            }
+        )
+
+    return styles
+
+
+def create_dash_table(df):
+    """Create a nicely formatted dash table
+
+    Rows are not embedded; pages are served by a callback with custom paging,
+    sorting and filtering.
+
+    Args:
+        df (pd.DataFrame): Course dataframe to use (only its columns are used)
+
+    Returns:
+        dash_table: dash_table html element
+    """
+
+    nice_table = dash_table.DataTable(
+        id="datatable-filtering",
+        data=[],
+        columns=[
+            {"name": n, "id": i}
+            for n, i in zip(
+                [
+                    "Subj",
+                    "Nmbr",
+                    "CRN",
+                    "Sec",
+                    "S",
+                    "Cam",
+                    "Title",
+                    "Credit",
+                    "Max",
+                    "Enrl",
+                    "WCap",
+                    "WLst",
+                    "Days",
+                    "Time",
+                    "Loc",
+                    "Rcap",
+                    "%Ful",
+                    "Begin/End",
+                    "Instructor",
+                ],
+                [*df.columns[:6], *df.columns[7:-3]],
+            )
+        ],
+        style_header={"backgroundColor": "rgb(230, 230, 230)", "fontWeight": "bold",},
+        style_cell={"font-family": "lato", "font-size": "0.6rem"},
+        style_cell_conditional=[
+            {
+                "if": {"column_id": i},
+                "textAlign": "left",
+                "minWidth": w,
+                "width": w,
+                "maxWidth": w,
+                "whiteSpace": "normal",
+                "lineHeight": "0.5rem",
+            }
+            for i, w in zip(
+                [*df.columns[:6], *df.columns[7:-3]],
+                [
+                    "3.5%",
+                    "5%",
+                    "4%",
+                    "4%",
+                    "2%",
+                    "4%",
+                    "10%",
+                    "5%",
+                    "4%",
+                    "4%",
+                    "5%",
+                    "5%",
+                    "5%",
+                    "7.5%",
+                    "6%",
+                    "4.5%",
+                    "4.5%",
+                    "7.5%",
+                    "9.5%",
+                ],
+            )
+        ],
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        filter_action="custom",
+        filter_query="",
+        fixed_rows={"headers": True, "data": 0},
+        page_size=TABLE_PAGE_SIZE,
+        page_current=0,
+        page_action="custom",
+        style_table={"height": "62vh", "overflowY": "auto"},
+        style_data_conditional=[
+            *data_bars("Max"),
+            {"if": {"row_index": "odd"}, "backgroundColor": "rgb(248, 248, 248)",},
+            {
+                "if": {"filter_query": "{Waitlisted} = 1", "column_id": "WList"},
+                "backgroundColor": "#FFEB9C",
+                "color": "#9C6500",
+            },
+            {
+                "if": {
+                    "filter_query": '{EnrollClass} = "low"',
+                    "column_id": "Enrolled",
+                },
+                "backgroundColor": "#FFC7CE",
+                "color": "#9C0006",
+            },
+            {
+                "if": {
+                    "filter_query": '{EnrollClass} = "near-full"',
+                    "column_id": "Enrolled",
+                },
+                "backgroundColor": "#C6EFCE",
+                "color": "#006100",
+            },
+            {
+                "if": {
+                    "filter_query": '{EnrollClass} = "full"',
+                    "column_id": "Enrolled",
+                },
+                "backgroundColor": "#008000",
+                "color": "white",
+            },
+            {"if": {"filter_query": "{Cancelled} = 1",}, "backgroundColor": "#FF4136",},
+        ],
+    )
+
+    return dbc.Container(
+        [nice_table], className="ml-2 mr-2 mt-5", style={"height": "65vh"}
+    )
+
+
+def data_graph(fig_obj: Any, id_name: str) -> Any:
+    """Creates dash graph from plotly graph object.
+
+    Args:
+        fig_obj (Any): a dash graph object
+        id_name (str): a unique id name for the component
+
+    Returns:
+        Any: a dash graph
+    """
+
+    return (
+        dcc.Graph(
+            figure=fig_obj,
+            id={"type": "tab-graph", "index": id_name},
+            style={"height": "65vh", "min-height": "750px"},
+        ),
+    )
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""Stage timing, memory and request latency metrics in Prometheus text format.
+
+Metrics are kept per process; with several server workers each one reports
+its own stages and requests.
+"""
+
+# Import required libraries
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported metric name
+NAMESPACE = "enrollment"
+
+
+def peak_rss_bytes() -> int:
+    """Helper method to return the peak resident set size of this process."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """Count the rows of a dataframe, or the total rows of a dict or tuple of them.
+
+    Args:
+        value (Any): dataframe, or a dict, list or tuple of dataframes
+
+    Returns:
+        Optional[int]: number of rows, or None if value holds no dataframes.
+    """
+
+    if isinstance(value, dict):
+        items: Any = value.values()
+    elif isinstance(value, (list, tuple)):
+        items = value
+    elif hasattr(value, "shape") and len(value.shape) > 0:
+        return int(value.shape[0])
+    else:
+        return None
+
+    counts = [count for count in map(count_rows, items) if count is not None]
+    return sum(counts) if counts else None
+
+
+def _escape(value: str) -> str:
+    """Helper method to escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    """Helper method to format Prometheus labels, e.g. {stage="parse"}."""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class StageRegistry:
+    """Thread-safe record of the latest run of every pipeline stage."""
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]) -> None:
+        """Store a finished stage and log it as a JSON line."""
+        with self._lock:
+            runs = self._stages.get(record["stage"], {}).get("runs", 0)
+            self._stages[record["stage"]] = {**record, "runs": runs + 1}
+        logger.info(json.dumps({"event": "stage", **record}))
+
+    def render(self) -> List[str]:
+        """Render the stage gauges and run counters in Prometheus text format."""
+        with self._lock:
+            stages = {name: dict(record) for name, record in self._stages.items()}
+
+        lines = []
+        for field, kind, help_text in [
+            ("seconds", "gauge", "Wall time of the latest run of a stage."),
+            ("rows", "gauge", "Rows handled by the latest run of a stage."),
+            ("peak_rss_bytes", "gauge", "Process peak RSS after a stage."),
+            ("runs", "counter", "Completed runs of a stage."),
+        ]:
+            name = f"{NAMESPACE}_stage_{field}" + (
+                "_total" if kind == "counter" else ""
+            )
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for stage_name, record in sorted(stages.items()):
+                if record.get(field) is not None:
+                    lines.append(
+                        f"{name}{_labels([('stage', stage_name)])} {record[field]}"
+                    )
+        return lines
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with a fixed set of label names."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        """Add an observation.
+
+        Args:
+            labels (Tuple[str, ...]): one value per label name
+            value (float): observed value, e.g. seconds
+        """
+
+        with self._lock:
+            # Per-bucket counts, then the sum and count of all observations
+            series = self._series.setdefault(labels, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        """Render the histogram in Prometheus text format."""
+        with self._lock:
+            all_series = {
+                labels: list(series) for labels, series in self._series.items()
+            }
+
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, series in sorted(all_series.items()):
+            pairs = list(zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, series):
+                bucket_labels = _labels(pairs + [("le", repr(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {int(count)}")
+            lines += [
+                f"{self.name}_bucket{_labels(pairs + [('le', '+Inf')])} "
+                f"{int(series[-1])}",
+                f"{self.name}_sum{_labels(pairs)} {series[-2]}",
+                f"{self.name}_count{_labels(pairs)} {int(series[-1])}",
+            ]
+        return lines
+
+
+STAGES = StageRegistry()
+REQUEST_LATENCY = Histogram(
+    f"{NAMESPACE}_request_seconds",
+    "Latency of Dash layout and callback requests.",
+    ("route", "output"),
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Dict[str, Any]]:
+    """Time a pipeline stage, recording its wall time, rows and peak RSS.
+
+    The yielded record can be given a row count:
+
+        with metrics.stage("read_archive") as record:
+            fact = archive.fact_table(conn, term)
+            record["rows"] = metrics.count_rows(fact)
+
+    Args:
+        name (str): stage name
+
+    Yields:
+        Dict[str, Any]: the stage record, logged and stored when the stage ends.
+    """
+
+    record: Dict[str, Any] = {"stage": name, "rows": None}
+    start = time.perf_counter()
+    yield record
+    record["seconds"] = time.perf_counter() - start
+    record["peak_rss_bytes"] = peak_rss_bytes()
+    STAGES.record(record)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorate a function to record each call as a stage.
+
+    The rows are those of the first argument, e.g. the dataframe a graph is
+    built from.
+
+    Args:
+        name (Optional[str]): stage name, the function name if not given
+
+    Returns:
+        Callable[[Callable], Callable]: the decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name or func.__name__) as record:
+                record["rows"] = count_rows(args[0]) if args else None
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    """Render every metric of this process in Prometheus text format."""
+    peak_name = f"{NAMESPACE}_process_peak_rss_bytes"
+    lines = [
+        f"# HELP {peak_name} Peak resident set size of the process.",
+        f"# TYPE {peak_name} gauge",
+        f"{peak_name} {peak_rss_bytes()}",
+    ]
+    lines += STAGES.render()
+    lines += REQUEST_LATENCY.render()
+    return "\n".join(lines) + "\n"
@@ -1,198 +1,169 @@
 # -*- coding: utf-8 -*-
 
-"""Graphs and tables for Plotly Dash webapp to process SWRCGSR Enrollment Reports."""
+"""Graphs for Plotly Dash webapp to process SWRCGSR Enrollment Reports."""
 
 # Import required libraries
-import dash_core_components as dcc
-import dash_bootstrap_components as dbc
-from typing import Any, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import plotly.io as pio
-import dash_table
+import plotly.utils
+
+# Module imports
+import cube
+import metrics
 
 # Include pretty graph formatting
 pio.templates.default = "ggplot2"
 
+# Over Time graph buttons: label -> (title, courses shown, or None for all)
+COURSE_GROUPS: Dict[str, Tuple[str, Optional[List[str]]]] = {
+    "All": ("All Courses", None),
+    "Core Lectures": (
+        "Core Lectures",
+        [
+            "CHE1010",
+            "CHE1100",
+            "CHE1800",
+            "CHE1810",
+            "CHE2100",
+            "CHE3000",
+            "CHE3100",
+            "CHE3110",
+            "CHE4310",
+        ],
+    ),
+    "Core Labs": (
+        "Core Labs",
+        [
+            "CHE1150",
+            "CHE1801",
+            "CHE1811",
+            "CHE2150",
+            "CHE3010",
+            "CHE3120",
+            "CHE3130",
+            "CHE4350",
+        ],
+    ),
+    "Upper Div": (
+        "Upper Div Courses",
+        [
+            "CHE3190",
+            "CHE3200",
+            "CHE4100",
+            "CHE4110",
+            "CHE4300",
+            "CHE4320",
+            "CHE4460",
+            "CHE4490",
+            "CHE4950",
+            "CHE4960",
+        ],
+    ),
+    "Crim Courses": (
+        "Criminalistics Courses",
+        ["CHE2710", "CHE2711", "CHE3610", "CHE4700", "CHE4710"],
+    ),
+}
 
-def generate_graphs(
-    tester: pd.DataFrame,
-    tester3: pd.DataFrame,
-    old: pd.DataFrame,
-    max_old: pd.DataFrame,
-) -> Tuple[Any, Any, Any]:
-    """Create plotly objects for our graphs.
+# Over Time graph switches to WebGL traces past either of these sizes
+WEBGL_TRACE_THRESHOLD = 100
+WEBGL_POINT_THRESHOLD = 20000
+
+# Number of most recent snapshots overlaid in the bar graphs
+BAR_SNAPSHOTS = 15
+
+
+def downsample_lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Pick points of a series with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are kept, and from each bucket in between the
+    point forming the largest triangle with its neighbours, so peaks and
+    turns in the curve survive.
 
     Args:
-        tester (pd.DataFrame): Course Data by total enrollment
-        tester3 (pd.DataFrame): Course data by percentage enrollment
-        old (pd.DataFrame): Course data by total enrollment, previous term
-        max_old (pd.DataFrame): Course data by max enrollment, previous term
+        x (np.ndarray): numeric x values, monotonic
+        y (np.ndarray): y values
+        n_out (int): number of points to keep, at least 3
 
     Returns:
-        Tuple[Any, Any, Any]: Plotly graph objects for:
-                            enrollment over time (fig4), total enrollment (fig2),
-                            and percentage enrollment (fig)
+        np.ndarray: positions of the kept points, in order.
     """
 
-    # Graph 1
-    all_true = [True] * 34
-
-    core_lecture = [
-        True,  # 1010
-        True,  # 1100
-        False,  # 1150
-        True,  # 1800
-        False,  # 1801
-        True,  # 1810
-        False,  # 1811
-        True,  # 2100
-        False,  # 2150
-        False,  # 2710
-        False,  # 2711
-        True,  # 3000
-        False,  # 3010
-        True,  # 3100
-        True,  # 3110
-        False,  # 3120
-        False,  # 3130
-        False,  # 3190
-        False,  # 3200
-        False,  # 3610
-        False,  # 3980
-        False,  # 4100
-        False,  # 4110
-        False,  # 4300
-        True,  # 4310
-        False,  # 4320
-        False,  # 4350
-        False,  # 4370
-        False,  # 4460
-        False,  # 4490
-        False,  # 4700
-        False,  # 4710
-        False,  # 4950
-        False,  # 4960
-    ]
+    n_in = len(x)
+    if n_out >= n_in or n_out < 3:
+        return np.arange(n_in)
+
+    edges = np.linspace(1, n_in - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n_in - 1
+
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n_in
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        prev_x, prev_y = x[keep[bucket]], y[keep[bucket]]
+        areas = np.abs(
+            (prev_x - next_x) * (y[start:stop] - prev_y)
+            - (prev_x - x[start:stop]) * (next_y - prev_y)
+        )
+        keep[bucket + 1] = start + int(np.argmax(areas))
 
-    core_lab = [
-        False,  # 1010
-        False,  # 1100
-        True,  # 1150
-        False,  # 1800
-        True,  # 1801
-        False,  # 1810
-        True,  # 1811
-        False,  # 2100
-        True,  # 2150
-        False,  # 2710
-        False,  # 2711
-        False,  # 3000
-        True,  # 3010
-        False,  # 3100
-        False,  # 3110
-        True,  # 3120
-        True,  # 3130
-        False,  # 3190
-        False,  # 3200
-        False,  # 3610
-        False,  # 3980
-        False,  # 4100
-        False,  # 4110
-        False,  # 4300
-        False,  # 4310
-        False,  # 4320
-        True,  # 4350
-        False,  # 4370
-        False,  # 4460
-        False,  # 4490
-        False,  # 4700
-        False,  # 4710
-        False,  # 4950
-        False,  # 4960
-    ]
+    return keep
 
-    upper_courses = [
-        False,  # 1010
-        False,  # 1100
-        False,  # 1150
-        False,  # 1800
-        False,  # 1801
-        False,  # 1810
-        False,  # 1811
-        False,  # 2100
-        False,  # 2150
-        False,  # 2710
-        False,  # 2711
-        False,  # 3000
-        False,  # 3010
-        False,  # 3100
-        False,  # 3110
-        False,  # 3120
-        False,  # 3130
-        True,  # 3190
-        True,  # 3200
-        False,  # 3610
-        False,  # 3980
-        True,  # 4100
-        True,  # 4110
-        True,  # 4300
-        False,  # 4310
-        True,  # 4320
-        False,  # 4350
-        False,  # 4370
-        True,  # 4460
-        True,  # 4490
-        False,  # 4700
-        False,  # 4710
-        True,  # 4950
-        True,  # 4960
-    ]
 
-    crim_courses = [
-        False,  # 1010
-        False,  # 1100
-        False,  # 1150
-        False,  # 1800
-        False,  # 1801
-        False,  # 1810
-        False,  # 1811
-        False,  # 2100
-        False,  # 2150
-        True,  # 2710
-        True,  # 2711
-        False,  # 3000
-        False,  # 3010
-        False,  # 3100
-        False,  # 3110
-        False,  # 3120
-        False,  # 3130
-        False,  # 3190
-        False,  # 3200
-        True,  # 3610
-        False,  # 3980
-        False,  # 4100
-        False,  # 4110
-        False,  # 4300
-        False,  # 4310
-        False,  # 4320
-        False,  # 4350
-        False,  # 4370
-        False,  # 4460
-        False,  # 4490
-        True,  # 4700
-        True,  # 4710
-        False,  # 4950
-        False,  # 4960
-    ]
+def group_visibility(courses: List[str], group: Optional[List[str]]) -> List[bool]:
+    """Helper method to build an updatemenu visibility mask for a course group."""
+    if group is None:
+        return [True] * len(courses)
+    members = set(group)
+    return [course in members for course in courses]
+
 
-    fig4 = go.Figure()
+@metrics.timed()
+def generate_over_time_graph(
+    tester: pd.DataFrame, webgl: Optional[bool] = None, max_points: Optional[int] = None
+) -> Any:
+    """Create the enrollment over time graph, with a button per course group.
+
+    Args:
+        tester (pd.DataFrame): Course Data by total enrollment
+        webgl (Optional[bool]): draw with WebGL traces; by default only when
+            the trace or point count passes WEBGL_TRACE_THRESHOLD or
+            WEBGL_POINT_THRESHOLD
+        max_points (Optional[int]): downsample each series to at most this many
+            points, keeping its shape; by default series are not downsampled
+
+    Returns:
+        Any: plotly graph object
+    """
 
     our_df = tester.T
+    courses = [str(course) for course in our_df.columns]
+
+    if webgl is None:
+        webgl = (
+            len(courses) > WEBGL_TRACE_THRESHOLD or our_df.size > WEBGL_POINT_THRESHOLD
+        )
+    scatter = go.Scattergl if webgl else go.Scatter
 
-    for column in our_df:
-        fig4.add_trace(go.Scatter(x=our_df.index, y=our_df[column], name=column,))
+    x_days = pd.to_datetime(our_df.index).asi8.astype(float)
+    traces = []
+    for course, column in zip(courses, our_df):
+        y = our_df[column]
+        if max_points is not None:
+            present = y.notna().to_numpy()
+            y = y[present]
+            y = y.iloc[downsample_lttb(x_days[present], y.to_numpy(float), max_points)]
+        traces.append(scatter(x=y.index, y=y, name=course))
+
+    fig4 = go.Figure(data=traces)
 
     fig4.update_yaxes(title="Enrolled")
     fig4.update_layout(
@@ -206,145 +177,126 @@ def generate_graphs(
         updatemenus=[
             go.layout.Updatemenu(
                 active=0,
-                buttons=list(
-                    [
-                        dict(
-                            label="All",
-                            method="update",
-                            args=[
-                                {"visible": all_true},
-                                {"title": "All Courses", "showlegend": True},
-                            ],
-                        ),
-                        dict(
-                            label="Core Lectures",
-                            method="update",
-                            args=[
-                                {"visible": core_lecture},
-                                {"title": "Core Lectures", "showlegend": True},
-                            ],
-                        ),
-                        dict(
-                            label="Core Labs",
-                            method="update",
-                            args=[
-                                {"visible": core_lab},
-                                {"title": "Core Labs", "showlegend": True},
-                            ],
-                        ),
-                        dict(
-                            label="Upper Div",
-                            method="update",
-                            args=[
-                                {"visible": upper_courses},
-                                {"title": "Upper Div Courses", "showlegend": True},
-                            ],
-                        ),
-                        dict(
-                            label="Crim Courses",
-                            method="update",
-                            args=[
-                                {"visible": crim_courses},
-                                {"title": "Criminalistics Courses", "showlegend": True},
-                            ],
-                        ),
-                    ]
-                ),
+                buttons=[
+                    dict(
+                        label=label,
+                        method="update",
+                        args=[
+                            {"visible": group_visibility(courses, group)},
+                            {"title": title, "showlegend": True},
+                        ],
+                    )
+                    for label, (title, group) in COURSE_GROUPS.items()
+                ],
             )
         ]
     )
 
-    # # graph 2
-    # fig2 = px.bar(
-    #     tester.iloc[:, :15],
-    #     color_discrete_sequence=px.colors.sequential.Turbo_r,
-    #     template="ggplot2",
-    #     barmode="overlay",
-    #     title="Student total enrollment over time",
-    # )
+    return fig4
 
-    # fig2.update_layout(yaxis_title="Student Count",)
 
-    # Graph 2
-    fig2 = go.Figure()
-    for i in range(15):
-        fig2.add_trace(
-            go.Bar(
-                x=tester.index,
-                y=tester.iloc[:, i],
-                name=tester.columns[i].strftime("%Y-%m-%d"),
-                marker_color=px.colors.sequential.Turbo_r[i],
-            )
-        )
+@metrics.timed()
+def generate_bar_graph(
+    df: pd.DataFrame, baseline: pd.DataFrame, yaxis_title: str
+) -> Any:
+    """Overlay the latest snapshots as bars, with a marker at each baseline value.
 
-    for i in range(len(old.index)):
-        if old.index[i] in tester.index:
-            ind = list(tester.index).index(old.index[i])
-            fig2.add_shape(
-                type="line",
-                x0=ind - 0.4,
-                y0=old.iloc[i, 0],
-                x1=ind + 0.4,
-                y1=old.iloc[i, 0],
-                opacity=1,
-                line=dict(color="Magenta", width=3),
-            )
+    Traces and shapes are built as plain dicts in one pass and the figure is
+    created without per-trace validation; only the layout is validated.
 
-    fig2.update_layout(
-        barmode="overlay",
-        colorscale={"sequential": px.colors.sequential.Turbo_r},
-        template="ggplot2",
-        title="Student total enrollment over time",
-        yaxis_title="Student Count",
-    )
+    Args:
+        df (pd.DataFrame): Course x Date data, newest snapshot first
+        baseline (pd.DataFrame): Course x Date data, first column is drawn
+        yaxis_title (str): y axis label
 
-    # Graph 3
-    # fig = px.bar(
-    #     tester3.iloc[:, :15],
-    #     template="ggplot2",
-    #     barmode="overlay",
-    #     color_discrete_sequence=px.colors.sequential.Turbo_r,
-    #     title="Percent max enrollment over time",
-    # )
+    Returns:
+        Any: plotly graph object
+    """
 
-    # fig.update_layout(yaxis_title="Fraction",)
+    snapshots = df.iloc[:, :BAR_SNAPSHOTS]
+    courses = df.index.to_numpy()
+    colors = px.colors.sequential.Turbo_r
+
+    data = [
+        {
+            "type": "bar",
+            "x": courses,
+            "y": snapshots.iloc[:, i].to_numpy(),
+            "name": day.strftime("%Y-%m-%d"),
+            "marker": {"color": colors[i]},
+        }
+        for i, day in enumerate(snapshots.columns)
+    ]
 
-    # Graph 3
-    fig = go.Figure()
-    for i in range(15):
-        fig.add_trace(
-            go.Bar(
-                x=tester3.index,
-                y=tester3.iloc[:, i],
-                name=tester3.columns[i].strftime("%Y-%m-%d"),
-                marker_color=px.colors.sequential.Turbo_r[i],
-            )
+    # Hash lookup of each baseline course's bar position, -1 if not shown
+    positions = df.index.get_indexer(baseline.index)
+    shown = positions >= 0
+    shapes = [
+        {
+            "type": "line",
+            "x0": center - 0.4,
+            "y0": level,
+            "x1": center + 0.4,
+            "y1": level,
+            "opacity": 1,
+            "line": {"color": "Magenta", "width": 3},
+        }
+        for center, level in zip(
+            positions[shown].tolist(), baseline.iloc[:, 0].to_numpy()[shown].tolist()
         )
+    ]
 
-    for i in range(len(max_old.index)):
-        if max_old.index[i] in tester.index:
-            ind = list(tester.index).index(max_old.index[i])
-            fig.add_shape(
-                type="line",
-                x0=ind - 0.4,
-                y0=max_old.iloc[i, 0],
-                x1=ind + 0.4,
-                y1=max_old.iloc[i, 0],
-                opacity=1,
-                line=dict(color="Magenta", width=3),
-            )
-
-    fig.update_layout(
+    layout = go.Layout(
         barmode="overlay",
-        colorscale={"sequential": px.colors.sequential.Turbo_r},
+        colorscale={"sequential": colors},
         template="ggplot2",
         title="Student total enrollment over time",
-        yaxis_title="Student Count",
+        yaxis_title=yaxis_title,
     )
+    layout_dict = layout.to_plotly_json()
+    layout_dict["shapes"] = shapes
+
+    return go.Figure(data=data, layout=layout_dict, _validate=False)
+
+
+@metrics.timed()
+def generate_graphs(
+    tester: pd.DataFrame,
+    tester3: pd.DataFrame,
+    old: pd.DataFrame,
+    max_old: pd.DataFrame,
+    webgl: Optional[bool] = None,
+    max_points: Optional[int] = None,
+) -> Tuple[Any, Any, Any]:
+    """Create plotly objects for our graphs.
+
+    Args:
+        tester (pd.DataFrame): Course Data by total enrollment
+        tester3 (pd.DataFrame): Course data by percentage enrollment
+        old (pd.DataFrame): Course data by total enrollment, previous term
+        max_old (pd.DataFrame): Course data by max enrollment, previous term
+        webgl (Optional[bool]): see generate_over_time_graph
+        max_points (Optional[int]): see generate_over_time_graph
+
+    Returns:
+        Tuple[Any, Any, Any]: Plotly graph objects for:
+                            enrollment over time (fig4), total enrollment (fig2),
+                            and percentage enrollment (fig)
+    """
+
+    # Graph 1
+    fig4 = generate_over_time_graph(tester, webgl=webgl, max_points=max_points)
+
+    # Graph 2
+    fig2 = generate_bar_graph(tester, old, "Student Count")
+
+    # Graph 3
+    fig = generate_bar_graph(tester3, max_old, "Student Count")
 
     return fig4, fig2, fig
 
 
+@metrics.timed()
 def generate_old_graph(test_vs_old: pd.DataFrame) -> Any:
     """Take in comparison vs previous year data and create a graph object.
 
@@ -379,6 +331,7 @@ def generate_old_graph(test_vs_old: pd.DataFrame) -> Any:
     return fig_old
 
 
+@metrics.timed()
 def generate_heatmap(tester3: pd.DataFrame) -> Any:
     """Take in enrollment over time data and create a heatmap graph object.
 
@@ -390,7 +343,7 @@ def generate_heatmap(tester3: pd.DataFrame) -> Any:
     """
 
     test = tester3
-    test = test.drop(["CHE3980", "CHE4370", "CHE4700", "CHE4710"])
+    test = test.drop(["CHE3980", "CHE4370", "CHE4700", "CHE4710"], errors="ignore")
     test = test.iloc[::-1]
     fig_map = go.Figure()
 
@@ -408,190 +361,176 @@ def generate_heatmap(tester3: pd.DataFrame) -> Any:
     return fig_map
 
 
-def data_bars(column_data, column_apply):
-    """Apply styling to dash table columns.
+@metrics.timed()
+def generate_prior_years_graph(cube_data: np.ndarray, axes: Dict[str, Any]) -> Any:
+    """Overlay total enrollment of a term and its prior years by days to the start.
 
     Args:
-        column_data: data from column.
-        column_apply: id of column to apply styles to.
+        cube_data (np.ndarray): enrollment cube from cube.build_cube
+        axes (Dict[str, Any]): axes from cube.build_cube
 
     Returns:
-        styles: a list of styles for the dash table
+        Any: plotly graph object
     """
 
-    n_bins = 100
-    bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
-    ranges = [100 * i for i in bounds]
-    styles = []
-    for i in range(1, len(bounds)):
-        min_bound = ranges[i - 1]
-        max_bound = ranges[i]
-        max_bound_percentage = bounds[i] * 100
-        styles.append(
-            {
-                "if": {
-                    "filter_query": (
-                        "{{{column}}} >= {min_bound}"
-                        + (
-                            " && {{{column}}} < {max_bound}"
-                            if (i < len(bounds) - 1)
-                            else ""
-                        )
-                    ).format(
-                        column=column_data, min_bound=min_bound, max_bound=max_bound
-                    ),
-                    "column_id": column_apply,
-                },
-                "background": (
-                    """
-                    linear-gradient(90deg,
-                    #CACACA 0%,
-                    #CACACA {max_bound_percentage}%,
-                    white {max_bound_percentage}%,
-                    white 100%)
-                """.format(
-                        max_bound_percentage=max_bound_percentage
-                    )
-                ),
-                "paddingBottom": 2,
-                "paddingTop": 2,
-            }
+    totals = cube.term_totals(cube_data, axes).dropna(how="all")
+    term = axes["terms"][0]
+
+    title = "Total enrollment by days to the start of term"
+    if len(axes["terms"]) > 1 and not totals[term].isna().all():
+        days_before = cube.latest_days_before(cube_data, axes)
+        day = totals.loc[-days_before]
+        prior_mean = day.iloc[1:].mean()
+        if prior_mean > 0:
+            title += (
+                f" ({day[term] / prior_mean:.0%} of the prior-year mean"
+                f" {days_before} days out)"
+            )
+
+    fig_years = go.Figure()
+    for i, name in enumerate(totals.columns):
+        fig_years.add_trace(
+            go.Scatter(
+                x=totals.index,
+                y=totals[name],
+                name=name,
+                mode="lines",
+                line=dict(width=4 if i == 0 else 2),
+            )
         )
 
-    return styles
+    fig_years.update_layout(
+        template="ggplot2",
+        title=title,
+        xaxis_title="Days from term start",
+        yaxis_title="Students",
+    )
 
+    return fig_years
 
-def create_dash_table(df):
-    """Create a nicely formatted dash table
+
+@metrics.timed()
+def generate_forecast_graph(forecast_df: pd.DataFrame) -> Any:
+    """Take in course forecasts and plot current and projected final enrollment.
 
     Args:
-        df (pd.DataFrame): Course dataframe to use
+        forecast_df (pd.DataFrame): forecasts from forecast.forecast_courses,
+                                    with a Max column of capacity
 
     Returns:
-        dash_table: dash_table html element
+        Any: plotly graph object
     """
 
-    nice_table = dash_table.DataTable(
-        id="datatable-filtering",
-        data=df.to_dict("records"),
-        columns=[
-            {"name": n, "id": i}
-            for n, i in zip(
-                [
-                    "Subj",
-                    "Nmbr",
-                    "CRN",
-                    "Sec",
-                    "S",
-                    "Cam",
-                    "Title",
-                    "Credit",
-                    "Max",
-                    "Enrl",
-                    "WCap",
-                    "WLst",
-                    "Days",
-                    "Time",
-                    "Loc",
-                    "Rcap",
-                    "%Ful",
-                    "Begin/End",
-                    "Instructor",
-                ],
-                [*df.columns[:6], *df.columns[7:-3]],
-            )
-        ],
-        style_header={"backgroundColor": "rgb(230, 230, 230)", "fontWeight": "bold",},
-        style_cell={"font-family": "lato", "font-size": "0.6rem"},
-        style_cell_conditional=[
-            {
-                "if": {"column_id": i},
-                "textAlign": "left",
-                "minWidth": w,
-                "width": w,
-                "maxWidth": w,
-                "whiteSpace": "normal",
-                "lineHeight": "0.5rem",
-            }
-            for i, w in zip(
-                [*df.columns[:6], *df.columns[7:-3]],
-                [
-                    "3.5%",
-                    "5%",
-                    "4%",
-                    "4%",
-                    "2%",
-                    "4%",
-                    "10%",
-                    "5%",
-                    "4%",
-                    "4%",
-                    "5%",
-                    "5%",
-                    "5%",
-                    "7.5%",
-                    "6%",
-                    "4.5%",
-                    "4.5%",
-                    "7.5%",
-                    "9.5%",
-                ],
-            )
-        ],
-        # sort_action="native",
-        # filter_action="native",
-        fixed_rows={"headers": True, "data": 0},
-        # page_size=5000,
-        # page_action="native",
-        style_table={"height": "62vh", "overflowY": "auto"},
-        style_data_conditional=[
-            *data_bars("Ratio", "Max"),
-            {"if": {"row_index": "odd"}, "backgroundColor": "rgb(248, 248, 248)",},
-            {
-                "if": {"filter_query": "{WList} > 0", "column_id": "WList"},
-                "backgroundColor": "#FFEB9C",
-                "color": "#9C6500",
-            },
-            {
-                "if": {
-                    "filter_query": "({Enrolled} < 10 && {Max} >= 20 && {S} contains A) || ({Enrolled} < 6 && {S} contains A)",  # noqa
-                    "column_id": "Enrolled",
-                },
-                "backgroundColor": "#FFC7CE",
-                "color": "#9C0006",
-            },
-            {
-                "if": {"filter_query": "{Ratio} > 80", "column_id": "Enrolled"},
-                "backgroundColor": "#C6EFCE",
-                "color": "#006100",
-            },
-            {
-                "if": {"filter_query": "{Ratio} > 94", "column_id": "Enrolled"},
-                "backgroundColor": "#008000",
-                "color": "white",
-            },
-            {"if": {"filter_query": "{S} contains C",}, "backgroundColor": "#FF4136",},
-        ],
+    fig_forecast = go.Figure()
+    fig_forecast.add_trace(
+        go.Bar(x=forecast_df.index, y=forecast_df["Enrolled"], name="Enrolled now")
+    )
+    fig_forecast.add_trace(
+        go.Bar(
+            x=forecast_df.index,
+            y=forecast_df["Forecast"],
+            name="Forecast",
+            error_y=dict(
+                type="data",
+                symmetric=False,
+                array=forecast_df["High"] - forecast_df["Forecast"],
+                arrayminus=forecast_df["Forecast"] - forecast_df["Low"],
+            ),
+            customdata=forecast_df[["Low", "High", "Years"]],
+            hovertemplate=(
+                "%{y:.0f} (%{customdata[0]:.0f} to %{customdata[1]:.0f}),"
+                " from %{customdata[2]} prior terms"
+            ),
+        )
+    )
+    fig_forecast.add_trace(
+        go.Scatter(
+            x=forecast_df.index,
+            y=forecast_df["Max"],
+            name="Max",
+            mode="markers",
+            marker=dict(symbol="line-ew", size=24, line=dict(width=3, color="black")),
+        )
     )
 
-    return dbc.Container(
-        [nice_table], className="ml-2 mr-2 mt-5", style={"height": "65vh"}
+    fig_forecast.update_layout(
+        template="ggplot2",
+        barmode="group",
+        title="Forecast final enrollment, with 90% intervals",
+        yaxis_title="Students",
     )
 
+    return fig_forecast
+
+
+def encode_typed_array(values: Any) -> Optional[Dict[str, str]]:
+    """Encode a numeric array as a base64 plotly.js typed array.
 
-def data_graph(fig_obj: Any, id_name: str) -> Any:
-    """Creates dash graph from plotly graph object.
+    Integers become the smallest of int8, int16 or int32 that fits, and floats
+    become float32.
 
     Args:
-        fig_obj (Any): a dash graph object
-        id_name (str): a unique id name for the component
+        values (Any): array-like trace attribute
 
     Returns:
-        Any: a dash graph
+        Optional[Dict[str, str]]: dtype/bdata(/shape) spec, or None if the
+                                  values are not numeric.
     """
 
-    return (
-        dcc.Graph(
-            figure=fig_obj, id=id_name, style={"height": "65vh", "min-height": "750px"},
-        ),
+    array = np.asarray(values)
+    if array.dtype.kind in "iu":
+        low, high = (array.min(), array.max()) if array.size else (0, 0)
+        for int_type in (np.int8, np.int16, np.int32):
+            if np.iinfo(int_type).min <= low and high <= np.iinfo(int_type).max:
+                break
+        array = array.astype(int_type)
+    elif array.dtype.kind == "f":
+        array = array.astype(np.float32)
+    else:
+        return None
+
+    spec = {
+        "dtype": array.dtype.str.lstrip("<|"),
+        "bdata": base64.b64encode(np.ascontiguousarray(array).tobytes()).decode(),
+    }
+    if array.ndim > 1:
+        spec["shape"] = ", ".join(str(size) for size in array.shape)
+    return spec
+
+
+def encode_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Helper method to replace the numeric arrays of a trace with typed arrays."""
+    encoded = {}
+    for key, value in trace.items():
+        if isinstance(value, dict):
+            encoded[key] = encode_trace(value)
+        elif isinstance(value, (np.ndarray, pd.Series, list, tuple)):
+            encoded[key] = encode_typed_array(value) or value
+        else:
+            encoded[key] = value
+    return encoded
+
+
+def figure_to_json(fig: Any, binary: bool = False) -> str:
+    """Serialize a figure for the dashboard.
+
+    Args:
+        fig (Any): plotly graph object
+        binary (bool): send numeric trace arrays as base64 typed arrays
+                       (needs plotly.js 2.28 or later to render)
+
+    Returns:
+        str: the figure as JSON.
+    """
+
+    if not binary:
+        return fig.to_json()
+
+    fig_dict = fig.to_plotly_json()
+    fig_dict["data"] = [encode_trace(trace) for trace in fig_dict["data"]]
+    return json.dumps(
+        fig_dict,
+        cls=plotly.utils.PlotlyJSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
     )
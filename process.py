@@ -3,24 +3,82 @@
 """Data processing for Plotly Dash webapp to process SWRCGSR Enrollment Reports."""
 
 # Import required libraries
-from typing import Tuple, Dict, Optional
+from typing import Any, Tuple, Dict, List, Optional
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import date
+from concurrent.futures import ProcessPoolExecutor
 import boto3
 from botocore.exceptions import ClientError
 import os
-import pickle
+import hashlib
+import json
+import logging
+import time
+
+# Module imports
+import archive
+import bundle
+import cube
+import datatable
+import forecast
+import metrics
+import plotdata
+import sections
+
+logger = logging.getLogger(__name__)
 
 # TERM DATA
 CURRENT_TERM = "Summer2021"
 PREVIOUS_TERM = "Summer2020"
 
+# Snapshot that current term max enrollment is taken from
+MAX_DATE = date(2021, 2, 25)
+
+# Terms served by the dashboard: term -> (term it is compared with, snapshot
+# that its max enrollment is taken from). Add a line to archive a term.
+TERMS: Dict[str, Tuple[str, date]] = {
+    CURRENT_TERM: (PREVIOUS_TERM, MAX_DATE),
+}
+
+# First day of classes of terms, where the cube.SEASON_STARTS estimate is off
+TERM_STARTS: Dict[str, date] = {}
+
+# Prior years of the same season kept in each term's enrollment cube
+CUBE_YEARS = 5
+
 # Load s3 environment variables
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
 AWS_BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME")
 
+# Directory (and S3 prefix) of the columnar serving bundles, one folder per term
+BUNDLE_DIR = "bundle"
+
+# Send figure arrays as base64 typed arrays (needs plotly.js 2.28 or later)
+FIGURE_BINARY = os.environ.get("FIGURE_ENCODING", "json") == "binary"
+
+# SQLite archive of every section snapshot, see archive.py
+ARCHIVE_DB = os.environ.get("ARCHIVE_DB", "archive.sqlite")
+
+# Number of processes used to parse workbooks
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+
+# Keys of the processed data that the dashboard serves
+SERVING_KEYS = [
+    "tester",
+    "tester3",
+    "older",
+    "max_old",
+    "test_vs_old",
+    "forecast",
+    "section_forecast",
+]
+
+# Previous term course numbers that were renumbered in the current catalog
+COURSE_RENAMES = {"CHE3260": "CHE4460", "CHE3290": "CHE4490"}
+
 
 # Helper Functions
 def upload_s3_file(file_name: str, bucket: str, object_name: Optional[str] = None):
@@ -48,15 +106,38 @@ def upload_s3_file(file_name: str, bucket: str, object_name: Optional[str] = Non
     return True
 
 
-def parse_files(term: str) -> Dict[date, pd.DataFrame]:
-    """Reads in a list of processed SWRCGSR files in .xlsx format
-    and returns them as a dictionary of pandas Dataframe values with date keys.
+def upload_s3_bundle(directory: str, bucket: str) -> bool:
+    """Upload a bundle directory to an S3 bucket under a prefix of the same name.
+
+    The manifest is uploaded last, so readers never see a manifest that refers
+    to files that are not there yet.
+
+    Args:
+        directory (str): bundle directory to upload
+        bucket (str): Bucket to upload to
+
+    Returns:
+        bool: True if every file was uploaded, else False
+    """
+
+    with open(Path(directory) / bundle.MANIFEST) as in_file:
+        manifest = json.load(in_file)
+
+    for name in [*bundle.bundle_files(manifest), bundle.MANIFEST]:
+        object_name = f"{directory}/{name}"
+        if not upload_s3_file(str(Path(directory) / name), bucket, object_name):
+            return False
+    return True
+
+
+def term_files(term: str) -> Dict[date, Path]:
+    """Find the processed SWRCGSR files for a term.
 
     Args:
         term (str): term to analyze, e.g. "Spring2021"
 
     Returns:
-        Dict[datetime.date,pd.DataFrame]
+        Dict[datetime.date, Path]: workbook paths keyed by snapshot date.
     """
 
     home = Path.cwd()
@@ -64,75 +145,174 @@ def parse_files(term: str) -> Dict[date, pd.DataFrame]:
     term_pattern = f"{term}_*.xlsx"
     files = list(directory.rglob(term_pattern))
     files_dict = {f.stem.split("_")[1]: f for f in files}
-    parse_dict = {}
-    for key, value in files_dict.items():
-        parse_dict[date(int(key[0:4]), int(key[4:6]), int(key[6:8]))] = pd.read_excel(
-            value, header=0, usecols=list(range(0, 25))
-        )
+    return {
+        date(int(key[0:4]), int(key[4:6]), int(key[6:8])): value
+        for key, value in files_dict.items()
+    }
+
+
+def read_workbook(path: Path) -> pd.DataFrame:
+    """Read a single processed SWRCGSR workbook."""
+    return pd.read_excel(path, header=0, usecols=list(range(0, 25)))
 
-    return parse_dict
 
+def timed_read_workbook(path: Path) -> Tuple[pd.DataFrame, float]:
+    """Read a single workbook, returning it with the seconds spent parsing it."""
+    start = time.perf_counter()
+    frame = read_workbook(path)
+    return frame, time.perf_counter() - start
 
-def parse_old(term: str) -> pd.DataFrame:
-    """Grabs the dataframe of last years enrollment.
+
+def read_workbooks(paths: List[Path], workers: int = 1) -> List[pd.DataFrame]:
+    """Parse workbooks in order, across a process pool if workers > 1.
+
+    The time spent in each file is logged.
 
     Args:
-        term (str): term to analyze, e.g. "Spring2020"
+        paths (List[Path]): workbooks to read
+        workers (int): number of parser processes
 
     Returns:
-        pd.DataFrame: dataframe of old enrollment.
+        List[pd.DataFrame]: parsed workbooks, in the same order as paths.
     """
-    home = Path.cwd()
-    directory = home / "count"
-    term_pattern = f"{term}_*.xlsx"
-    files = list(directory.rglob(term_pattern))
-    files_dict = {f.stem.split("_")[1]: f for f in files}
-    parse_dict = {}
-    for key, value in files_dict.items():
-        parse_dict[date(int(key[0:4]), int(key[4:6]), int(key[6:8]))] = pd.read_excel(
-            value, header=0, usecols=list(range(0, 25))
+
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            results = list(pool.map(timed_read_workbook, paths))
+    else:
+        results = [timed_read_workbook(path) for path in paths]
+
+    for path, (_, seconds) in zip(paths, results):
+        logger.info("Parsed %s in %.3f s", path.name, seconds)
+
+    return [frame for frame, _ in results]
+
+
+def file_digest(path: Path) -> str:
+    """Helper method to hash the contents of a workbook."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_workbooks(
+    files_dict: Dict[date, Path], workers: int = 1
+) -> Dict[date, pd.DataFrame]:
+    """Parse workbooks keyed by date.
+
+    Args:
+        files_dict (Dict[datetime.date, Path]): workbooks to read
+        workers (int): number of parser processes
+
+    Returns:
+        Dict[datetime.date,pd.DataFrame]
+    """
+
+    frames = read_workbooks(list(files_dict.values()), workers)
+    return dict(zip(files_dict, frames))
+
+
+def archive_term(conn: Any, term: str, workers: int = 1) -> int:
+    """Bring a term's snapshots in the archive up to date with its workbooks.
+
+    Only new or changed workbooks are parsed and stored, and snapshots whose
+    workbook was deleted are removed, all in one transaction. The newest
+    workbook is also stored whole, see archive.latest_snapshot.
+
+    Args:
+        conn (sqlite3.Connection): archive connection from archive.connect
+        term (str): term to archive, e.g. "Spring2021"
+        workers (int): number of parser processes
+
+    Returns:
+        int: number of section rows stored.
+    """
+
+    files_dict = term_files(term)
+    digests = {key: file_digest(value) for key, value in files_dict.items()}
+    archived = archive.workbook_digests(conn, term)
+
+    changed = {
+        key: value
+        for key, value in files_dict.items()
+        if archived.get(key) != digests[key]
+    }
+    newest = max(files_dict, default=None)
+    to_parse = dict(changed)
+    if newest is not None and archive.latest_date(conn, term) != newest:
+        to_parse[newest] = files_dict[newest]
+    parse_dict = parse_workbooks(to_parse, workers=workers)
+
+    with conn:
+        archive.delete_snapshots(conn, term, set(archived) - set(files_dict))
+        rows = archive.load_snapshots(
+            conn, term, {key: parse_dict[key] for key in changed}, digests
         )
+        if newest in parse_dict:
+            archive.store_latest(conn, term, newest, parse_dict[newest])
+    return rows
 
-    return list(parse_dict.values())[0]
 
+def first_snapshot(fact: pd.DataFrame) -> pd.DataFrame:
+    """Helper method to select the rows of the earliest snapshot in a fact table."""
+    return fact[fact["Date"] == fact["Date"].min()]
 
-def process_data(
-    parse_dict: Dict[date, pd.DataFrame]
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Read the parse dict to create dataframes for plotting.
+
+def pivot_enrollment(fact: pd.DataFrame) -> pd.DataFrame:
+    """Helper method to total a fact table into a Course x Date enrollment table."""
+    test = fact.groupby(["Course", "Date"])["Enrolled"].sum()
+    return test.reset_index().pivot(index="Course", columns="Date", values="Enrolled")
+
+
+def ratio_table(
+    counts: pd.DataFrame, baseline: pd.Series, fill_invalid: Optional[float] = None
+) -> pd.DataFrame:
+    """Divide a Course x Date table by a per-course baseline in one step.
 
     Args:
-        parse_dict (Dict[pd.DataFrame])
+        counts (pd.DataFrame): Course x Date enrollment table
+        baseline (pd.Series): capacity or previous enrollment, indexed by Course
+        fill_invalid (Optional[float]): value for courses that are missing from
+            the baseline or have a zero baseline. If None, a course missing
+            from the baseline raises KeyError.
 
     Returns:
-        Tuple[pd.DataFrame, pd.DataFrame]: tuple of dataframes for plotting enrollment.
+        pd.DataFrame: Course x Date table of ratios.
     """
 
-    final_df = pd.DataFrame(columns=["Date", "Enrolled", "CRN", "Course"])
-    for key, value in parse_dict.items():
-        temp_df = value[["CRN", "Enrolled", "Course"]].copy()
-        temp_df["Date"] = key
-        final_df = pd.concat([final_df, temp_df])
+    known = counts.index.isin(baseline.index)
+    if fill_invalid is None and not known.all():
+        raise KeyError(list(counts.index[~known]))
 
-    max_df = pd.DataFrame(columns=["Date", "Enrolled", "CRN", "Course", "Max"])
-    for key, value in parse_dict.items():
-        temp_df = value[["CRN", "Enrolled", "Course", "Max"]].copy()
-        temp_df["Date"] = key
-        max_df = pd.concat([max_df, temp_df])
+    aligned = baseline.reindex(counts.index)
+    ratio = counts.div(aligned, axis=0).astype(float)
 
-    test = final_df.groupby(["Course", "Date"])["Enrolled"].sum()
-    test = pd.DataFrame(test)
+    if fill_invalid is not None:
+        ratio.loc[~known | (aligned == 0).to_numpy()] = fill_invalid
 
-    max_test = parse_dict[date(2021, 2, 25)][["Course", "Max"]]
-    max_test2 = max_test.groupby("Course")["Max"].sum()
+    return ratio
+
+
+def process_data(
+    fact: pd.DataFrame, max_date: date = MAX_DATE
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read the fact table to create dataframes for plotting.
 
-    test2 = test.reset_index().pivot(index="Course", columns="Date", values="Enrolled")
-    test3 = test2.copy()
+    Args:
+        fact (pd.DataFrame): fact table from archive.fact_table
+        max_date (datetime.date): snapshot to take max enrollment from
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: tuple of dataframes for plotting enrollment.
+    """
+
+    max_test = fact[fact["Date"] == max_date][["Course", "Max"]]
+    max_test2 = max_test.groupby("Course")["Max"].sum()
 
-    for ix, value in test3.iteritems():
-        for ind, each in value.items():
-            beep = each / max_test2[ind]
-            test3.loc[ind, ix] = float(beep)
+    test2 = pivot_enrollment(fact)
+    test3 = ratio_table(test2, max_test2)
 
     tester = test2[test2.columns[::-1]]
     tester3 = test3[test3.columns[::-1]]
@@ -140,111 +320,308 @@ def process_data(
     return tester, tester3
 
 
-def process_max_old(parse_dict: Dict[date, pd.DataFrame]) -> pd.DataFrame:
+def process_max_old(fact: pd.DataFrame) -> pd.DataFrame:
     """Helper method to find max enrollment in previous term."""
-    final_df = pd.DataFrame(columns=["Date", "Enrolled", "CRN", "Course"])
-    for key, value in parse_dict.items():
-        temp_df = value[["CRN", "Enrolled", "Course"]].copy()
-        temp_df["Date"] = key
-        final_df = pd.concat([final_df, temp_df])
-    test = pd.DataFrame(final_df.groupby(["Course", "Date"])["Enrolled"].sum())
-
-    max_test = list(parse_dict.values())[0][["Course", "Max"]]
+    max_test = first_snapshot(fact)[["Course", "Max"]]
     max_test2 = max_test.groupby("Course")["Max"].sum()
 
-    test2 = test.reset_index().pivot(index="Course", columns="Date", values="Enrolled")
-    test3 = test2.copy()
-
-    for ix, value in test3.iteritems():
-        for ind, each in value.items():
-            beep = each / max_test2[ind]
-            test3.loc[ind, ix] = float(beep)
+    test2 = pivot_enrollment(fact)
+    test3 = ratio_table(test2, max_test2)
 
     tester = test3[test3.columns[::-1]]
     return tester
 
 
-def process_df_to_counts(parse_dict: Dict[date, pd.DataFrame]) -> pd.DataFrame:
+def process_df_to_counts(fact: pd.DataFrame) -> pd.DataFrame:
     """Helper method to process and format a df into a count of enrollment"""
-    final_df = pd.DataFrame(columns=["Date", "Enrolled", "CRN", "Course"])
-    for key, value in parse_dict.items():
-        temp_df = value[["CRN", "Enrolled", "Course"]].copy()
-        temp_df["Date"] = key
-        final_df = pd.concat([final_df, temp_df])
-    test = pd.DataFrame(final_df.groupby(["Course", "Date"])["Enrolled"].sum())
-    test2 = test.reset_index().pivot(index="Course", columns="Date", values="Enrolled")
+    test2 = pivot_enrollment(fact)
     tester = test2[test2.columns[::-1]]
     return tester
 
 
-def process_vs_old(
-    parse_dict: Dict[date, pd.DataFrame], old_df: pd.DataFrame
-) -> pd.DataFrame:
-    """Read the parse_dict and create a comparison of current vs previous year enrollment.
+def process_vs_old(fact: pd.DataFrame, old_fact: pd.DataFrame) -> pd.DataFrame:
+    """Create a comparison of current vs previous year enrollment from fact tables.
+
+    The previous year baseline is the earliest snapshot of old_fact by date.
 
     Args:
-        parse_dict (Dict[pd.DataFrame])
-        old_df (pd.DataFrame)
+        fact (pd.DataFrame): fact table of the current term
+        old_fact (pd.DataFrame): fact table of the previous term
 
     Returns:
         pd.DataFrame
     """
 
-    final_df = pd.DataFrame(columns=["Date", "Enrolled", "CRN", "Course"])
-    for key, value in parse_dict.items():
-        temp_df = value[["CRN", "Enrolled", "Course"]].copy()
-        temp_df["Date"] = key
-        final_df = pd.concat([final_df, temp_df])
-
-    test = final_df.groupby(["Course", "Date"])["Enrolled"].sum()
-    test = pd.DataFrame(test)
-
-    test2 = test.reset_index().pivot(index="Course", columns="Date", values="Enrolled")
-    test3 = test2.copy()
+    test2 = pivot_enrollment(fact)
 
-    max_test = old_df[["Course", "Enrolled"]]
+    max_test = first_snapshot(old_fact)[["Course", "Enrolled"]]
     max_test2 = max_test.groupby("Course")["Enrolled"].sum()
 
-    max_test2 = max_test2.rename(index={"CHE3260": "CHE4460", "CHE3290": "CHE4490"})
+    max_test2 = max_test2.rename(index=COURSE_RENAMES)
 
-    for ix, value in test3.iteritems():
-        for ind, each in value.items():
-            try:
-                if max_test2[ind] == 0:
-                    beep = 0
-                else:
-                    beep = each / max_test2[ind]
-            except KeyError:
-                beep = 0
-            test3.loc[ind, ix] = float(beep)
+    test3 = ratio_table(test2, max_test2, fill_invalid=0)
 
     test_vs_old = test3[test3.columns[::-1]]
 
     return test_vs_old
 
 
-def prepare_s3_pickle(filename: str = "data.pickle") -> None:
-    parse_dict = parse_files(CURRENT_TERM)
-    tester, tester3 = process_data(parse_dict)
-    old_df = parse_old(PREVIOUS_TERM)
-    old1 = parse_files(PREVIOUS_TERM)
-    older = process_df_to_counts(old1)
-    max_old = process_max_old(old1)
-    test_vs_old = process_vs_old(parse_dict, old_df)
+def compact_frame(df: pd.DataFrame, floats: bool = True) -> pd.DataFrame:
+    """Shrink a dataframe to compact dtypes for serving.
+
+    Course codes and repetitive text become categoricals, integers become int16
+    (or int32 when they do not fit) and floats become float32.
+
+    Args:
+        df (pd.DataFrame): dataframe to compact
+        floats (bool): also shrink floats; keep them float64 for tables shown
+                       as they are, where float32 would show 89.5999984741211
+
+    Returns:
+        pd.DataFrame: a compacted copy.
+    """
+
+    out = df.copy()
+    if out.index.name == "Course":
+        out.index = pd.CategoricalIndex(out.index, name="Course")
+
+    int16 = np.iinfo(np.int16)
+    for column in out.columns:
+        series = out[column]
+        if pd.api.types.is_integer_dtype(series):
+            fits = series.empty or (
+                series.min() >= int16.min and series.max() <= int16.max
+            )
+            out[column] = series.astype(np.int16 if fits else np.int32)
+        elif pd.api.types.is_float_dtype(series):
+            if floats:
+                out[column] = series.astype(np.float32)
+        elif pd.api.types.infer_dtype(series, skipna=True) == "string" and (
+            column == "Course" or series.nunique() <= len(series) // 2
+        ):
+            out[column] = series.astype("category")
+
+    return out
+
+
+def frame_nbytes(value: Any) -> int:
+    """Helper method to total the memory of dataframes and arrays in a dictionary."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(frame_nbytes(each) for each in value.values())
+    return 0
+
+
+def build_serving_bundle(data_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the dashboard needs from the processed data, compacted.
+
+    Args:
+        data_dict (Dict[str, Any]): every processed dataframe, including the
+                                    latest workbook as latest
+
+    Returns:
+        Dict[str, Any]: the aggregate tables, the latest snapshot, and the
+                        enrollment cube and section matrices with their axes.
+    """
+
+    serving: Dict[str, Any] = {
+        key: compact_frame(data_dict[key]) for key in SERVING_KEYS
+    }
+    # The Latest Data table serves its values as they are, so floats stay float64
+    serving["latest"] = compact_frame(
+        datatable.highlight_flags(data_dict["latest"]), floats=False
+    )
+    serving["cube"] = data_dict["cube"]
+    serving["cube_axes"] = json.dumps(data_dict["cube_axes"])
+    serving["sections"] = data_dict["sections"]
+    serving["section_axes"] = json.dumps(data_dict["section_axes"])
+
+    logger.info(
+        "Serving bundle is %d bytes in memory, down from %d",
+        frame_nbytes(serving),
+        frame_nbytes(data_dict),
+    )
+    return serving
+
+
+def render_figures(
+    data_dict: Dict[str, Any], binary: bool = FIGURE_BINARY
+) -> Dict[str, str]:
+    """Render every dashboard figure to Plotly JSON, once per data update.
+
+    Args:
+        data_dict (Dict[str, Any]): processed dataframes
+        binary (bool): encode numeric trace arrays as base64 typed arrays
+
+    Returns:
+        Dict[str, str]: serialized figures keyed by bundle key.
+    """
+
+    fig4, fig2, fig = plotdata.generate_graphs(
+        data_dict["tester"],
+        data_dict["tester3"],
+        data_dict["older"],
+        data_dict["max_old"],
+    )
+    figures = {
+        "fig4": fig4,
+        "fig2": fig2,
+        "fig": fig,
+        "fig_old": plotdata.generate_old_graph(data_dict["test_vs_old"]),
+        "fig_map": plotdata.generate_heatmap(data_dict["tester3"]),
+        "fig_years": plotdata.generate_prior_years_graph(
+            data_dict["cube"], data_dict["cube_axes"]
+        ),
+        "fig_forecast": plotdata.generate_forecast_graph(data_dict["forecast"]),
+    }
+
+    return {
+        key: plotdata.figure_to_json(value, binary=binary)
+        for key, value in figures.items()
+    }
+
+
+def build_term_cube(
+    conn: Any, term: str, fact: pd.DataFrame
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Build a term's enrollment cube from its fact table and the archive.
+
+    Args:
+        conn (sqlite3.Connection): archive connection from archive.connect
+        term (str): term of the bundle, e.g. "Summer2021"
+        fact (pd.DataFrame): fact table of the term
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Any]]: cube and axes, see cube.build_cube.
+    """
+
+    facts = {term: fact}
+    archived = set(archive.terms(conn))
+    for name in cube.prior_terms(term, CUBE_YEARS):
+        if name in archived:
+            facts[name] = archive.fact_table(conn, name)
+    starts = {name: cube.term_start(name, TERM_STARTS) for name in facts}
+    return cube.build_cube(facts, starts, COURSE_RENAMES)
+
+
+def build_forecast(
+    cube_data: np.ndarray, cube_axes: Dict[str, Any], fact: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Forecast final enrollment of every course and section of a term.
+
+    Args:
+        cube_data (np.ndarray): the term's enrollment cube
+        cube_axes (Dict[str, Any]): axes of the cube
+        fact (pd.DataFrame): fact table of the term
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: course forecasts, with the latest
+            capacity as Max, and section forecasts.
+    """
+
+    days_before = cube.latest_days_before(cube_data, cube_axes)
+    courses = forecast.forecast_courses(cube_data, cube_axes, days_before)
+    latest = fact[fact["Date"] == fact["Date"].max()]
+    courses["Max"] = latest.groupby("Course")["Max"].sum().reindex(courses.index)
+    return courses, forecast.forecast_sections(latest, courses)
+
+
+def prepare_s3_bundle(term: str = CURRENT_TERM, directory: str = BUNDLE_DIR) -> str:
+    """Process a term and write its serving bundle to directory/term/version.
+
+    Args:
+        term (str): one of TERMS, e.g. "Summer2021"
+        directory (str): bundle root directory
+
+    Returns:
+        str: version of the bundle written.
+    """
+
+    previous_term, max_date = TERMS[term]
+    conn = archive.connect(ARCHIVE_DB)
+    with metrics.stage("archive") as record:
+        archived_terms = dict.fromkeys(
+            [term, previous_term, *cube.prior_terms(term, CUBE_YEARS)]
+        )
+        record["rows"] = sum(
+            archive_term(conn, name, workers=PARSE_WORKERS) for name in archived_terms
+        )
+
+    with metrics.stage("read_archive") as record:
+        snapshot = archive.latest_snapshot(conn, term)
+        if snapshot is None:
+            raise FileNotFoundError(f"No workbooks found for {term}")
+        fact = archive.fact_table(conn, term)
+        old_fact = archive.fact_table(conn, previous_term)
+        record["rows"] = len(fact) + len(old_fact)
+
+    with metrics.stage("build_cube") as record:
+        cube_data, cube_axes = build_term_cube(conn, term, fact)
+        record["rows"] = len(cube_axes["courses"])
+
+    with metrics.stage("build_sections") as record:
+        section_data, section_axes = sections.build_section_matrices(
+            archive.section_snapshots(conn, term)
+        )
+        record["rows"] = len(section_axes["crns"])
+    conn.close()
+
+    with metrics.stage("forecast") as record:
+        course_forecast, section_forecast = build_forecast(cube_data, cube_axes, fact)
+        record["rows"] = len(section_forecast)
+
+    with metrics.stage("aggregate") as record:
+        tester, tester3 = process_data(fact, max_date)
+        older = process_df_to_counts(old_fact)
+        max_old = process_max_old(old_fact)
+        test_vs_old = process_vs_old(fact, old_fact)
+        record["rows"] = len(tester) + len(older)
 
     data_dict = {
-        "parse_dict": parse_dict,
+        "latest": snapshot[1],
         "tester": tester,
         "tester3": tester3,
-        "old_df": old_df,
-        "old1": old1,
         "older": older,
         "max_old": max_old,
         "test_vs_old": test_vs_old,
+        "cube": cube_data,
+        "cube_axes": cube_axes,
+        "forecast": course_forecast,
+        "section_forecast": section_forecast,
+        "sections": section_data,
+        "section_axes": section_axes,
     }
-    pickle.dump(data_dict, open(filename, "wb"))
+    with metrics.stage("build_serving_bundle") as record:
+        serving = build_serving_bundle(data_dict)
+        record["rows"] = metrics.count_rows(serving)
+    with metrics.stage("render_figures"):
+        serving.update(render_figures(data_dict))
+    term_directory = Path(directory) / term
+    with metrics.stage("write_bundle") as record:
+        manifest = bundle.write_versioned_bundle(serving, str(term_directory))
+        record["rows"] = metrics.count_rows(serving)
+    bundle.remove_stale_versions(str(term_directory), manifest["version"])
+    version_directory = term_directory / manifest["version"]
+    disk_bytes = sum(
+        (version_directory / name).stat().st_size
+        for name in bundle.bundle_files(manifest)
+    )
+    logger.info("Serving bundle for %s is %d bytes on disk", term, disk_bytes)
+    return manifest["version"]
 
 
 if __name__ == "__main__":
-    prepare_s3_pickle()
-    upload_s3_file("data.pickle", AWS_BUCKET_NAME)
+    logging.basicConfig(level=logging.INFO)
+    versions = {term: prepare_s3_bundle(term) for term in TERMS}
+    bundle.write_term_index(BUNDLE_DIR, versions, CURRENT_TERM)
+    with metrics.stage("upload_s3_bundle"):
+        for term in TERMS:
+            upload_s3_bundle(f"{BUNDLE_DIR}/{term}/{versions[term]}", AWS_BUCKET_NAME)
+        upload_s3_file(
+            f"{BUNDLE_DIR}/{bundle.TERM_INDEX}",
+            AWS_BUCKET_NAME,
+            f"{BUNDLE_DIR}/{bundle.TERM_INDEX}",
+        )
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Section-level (CRN) enrollment time series for course drilldowns.
+
+Enrollment, waitlist and capacity of every section are stored as one float32
+array of series x CRN x snapshot date. Rows are ordered by course, so the
+sections of a course are one contiguous slice, and a course or CRN lookup is
+a dictionary access and an array view.
+"""
+
+# Import required libraries
+from typing import Any, Dict, List, Tuple
+from datetime import date
+import numpy as np
+import pandas as pd
+
+# Series stored along the first axis, as snapshot columns
+SERIES = ["Enrolled", "WList", "Max"]
+
+
+def build_section_matrices(
+    snapshots: pd.DataFrame,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Arrange section snapshots into series x CRN x date matrices.
+
+    Args:
+        snapshots (pd.DataFrame): Date, CRN, Course and SERIES columns, e.g.
+                                  from archive.section_snapshots
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Any]]: float32 matrices, NaN where a
+            section is missing from a snapshot, and their axes: CRNs, dates,
+            series and the row range of each course.
+    """
+
+    snapshots = snapshots.dropna(subset=["CRN", "Course"])
+    totals = snapshots.groupby(["CRN", "Date"])[SERIES].sum(min_count=1)
+
+    # Each section belongs to the course it was last listed under
+    sections = (
+        snapshots.sort_values("Date", kind="mergesort")
+        .drop_duplicates("CRN", keep="last")
+        .sort_values(["Course", "CRN"])
+    )
+    crns = pd.Index(sections["CRN"].astype(int))
+    dates = pd.Index(sorted(snapshots["Date"].unique()))
+
+    rows = crns.get_indexer(totals.index.get_level_values("CRN"))
+    columns = dates.get_indexer(totals.index.get_level_values("Date"))
+    matrices = np.full((len(SERIES), len(crns), len(dates)), np.nan, dtype=np.float32)
+    matrices[:, rows, columns] = totals.to_numpy(dtype=np.float32).T
+
+    courses = sections["Course"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, courses[1:] != courses[:-1]])
+    stops = np.r_[starts[1:], len(courses)]
+    axes = {
+        "crns": crns.tolist(),
+        "dates": [day.isoformat() for day in dates],
+        "series": SERIES,
+        "course_rows": {
+            courses[start]: [int(start), int(stop)]
+            for start, stop in zip(starts, stops)
+        },
+    }
+    return matrices, axes
+
+
+class SectionIndex:
+    """Constant-time lookup of the section time series of a course or CRN."""
+
+    def __init__(self, matrices: np.ndarray, axes: Dict[str, Any]) -> None:
+        self.matrices = matrices
+        self.crns = axes["crns"]
+        self.dates = [date.fromisoformat(day) for day in axes["dates"]]
+        self.series = axes["series"]
+        self.rows = {crn: row for row, crn in enumerate(self.crns)}
+        self.course_rows = {
+            course: slice(start, stop)
+            for course, (start, stop) in axes["course_rows"].items()
+        }
+
+    def __contains__(self, course: Any) -> bool:
+        return course in self.course_rows
+
+    def course(self, course: str) -> Tuple[List[int], Dict[str, np.ndarray]]:
+        """Return the sections of a course and their time series.
+
+        Args:
+            course (str): course, e.g. "CHE1800"
+
+        Returns:
+            Tuple[List[int], Dict[str, np.ndarray]]: CRNs of the sections, and
+                each series as a section x date array.
+        """
+
+        rows = self.course_rows[course]
+        return self.crns[rows], dict(zip(self.series, self.matrices[:, rows, :]))
+
+    def crn(self, crn: int) -> Dict[str, np.ndarray]:
+        """Return the time series of one section, each indexed like dates."""
+        return dict(zip(self.series, self.matrices[:, self.rows[crn], :]))